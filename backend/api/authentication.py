@@ -0,0 +1,95 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .constants import AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TIMEOUT
+from core.prometheus import record_cache
+from core.versions import get_version
+from users.constants import AUTH_VERSION_KEY
+
+
+class TokenCache:
+    """
+    LRU-кэш в памяти процесса: ключ токена -> (пользователь, токен).
+    Хранит не больше size записей, каждая живёт не дольше timeout секунд
+    и запоминает версию аутентификации пользователя, при которой
+    была сохранена (сверяет её CachedTokenAuthentication).
+    """
+    def __init__(self, size=AUTH_TOKEN_CACHE_SIZE,
+                 timeout=AUTH_TOKEN_CACHE_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """Возвращает пару (значение, версия) или None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+
+                return None
+
+            value, version, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+
+                return None
+
+            self.entries.move_to_end(key)
+
+            return value, version
+
+    def set(self, key, value, version):
+        with self.lock:
+            self.entries[key] = (value,
+                                 version,
+                                 time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+def get_auth_version(user_id):
+    """Версия аутентификации пользователя (см. users.signals)."""
+    return get_version(AUTH_VERSION_KEY.format(user_id=user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшем токенов в памяти процесса.
+    Повторный запрос с тем же токеном не обращается к БД:
+    достаточно прочитать версию аутентификации его пользователя
+    из общего кэша версий. Версия пользователя меняется сигналами
+    при удалении его токена (выход), изменении пользователя
+    (смена пароля, деактивация, правка профиля) и его удалении,
+    поэтому такие изменения сразу действуют во всех воркерах,
+    а токены остальных пользователей остаются в кэше.
+    При промахе версия читается до загрузки пользователя:
+    изменение, закоммиченное между ними, сменит версию после чтения,
+    и запись устареет сразу.
+    Каждый запрос получает свою копию пользователя.
+    """
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            (user, token), version = cached
+            if get_auth_version(user.pk) != version:
+                cached = None
+        record_cache('token', cached is not None)
+        if cached is None:
+            user_id = (Token.objects.filter(key=key)
+                       .values_list('user_id', flat=True).first())
+            # Несуществующий токен отклонит super().
+            version = get_auth_version(user_id) if user_id else None
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token), version)
+
+        return copy.copy(user), token
@@ -1 +1,29 @@
 DATE_FORMAT = '%d.%m.%Y'
+INGREDIENT_SEARCH_MODE_PARAM = 'mode'
+FUZZY_SEARCH_MODE = 'fuzzy'
+SHOPPING_CART_FORMAT_PARAM = 'format'
+SHOPPING_CART_CACHE_KEY = ('shopping_cart:{user_id}:{cart_version}'
+                           ':{ingredients_version}')
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+SHOPPING_CART_ITERATOR_CHUNK_SIZE = 2000
+STREAM_CHUNK_SIZE = 64 * 1024
+PDF_PAGE_SIZE = (1240, 1754)
+PDF_RESOLUTION = 150
+PDF_MARGIN = 100
+PDF_FONT_SIZE = 28
+PDF_LINE_HEIGHT = 40
+RESPONSE_CACHE_KEY = 'response:{version_key}:{version}:{path}'
+RESPONSE_CACHE_TIMEOUT = 24 * 60 * 60
+CURSOR_PAGINATION_PARAM = 'cursor'
+RECIPES_CURSOR_ORDERING = ('-pub_date', '-id')
+USERS_CURSOR_ORDERING = ('username',)
+COUNT_CACHE_KEY = 'count:{versions}:{query}'
+COUNT_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+LOCALHOST_ADDRESSES = ('127.0.0.1', '::1')
+POPULAR_RECIPES_ORDERING = ('-popularity_score', '-id')
+FEED_ORDERING = ('-feed_pub_date', '-id')
+COOKABLE_LIMIT = 20
+COOKABLE_MAX_LIMIT = 100
+COOKABLE_MAX_INGREDIENTS = 200
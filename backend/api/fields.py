@@ -0,0 +1,50 @@
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from recipes.images import VARIANTS, image_variants
+
+
+class UploadedImageField(Base64ImageField):
+    """
+    Картинка в виде base64-строки (как раньше)
+    или файла из multipart/form-data.
+    Файл из формы Django принимает потоково и, если он больше
+    FILE_UPLOAD_MAX_MEMORY_SIZE, складывает во временный файл на диске,
+    поэтому память воркера не растёт с размером картинки.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+
+            return serializers.ImageField.to_internal_value(self, data)
+
+        return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Словарь URL уменьшенных вариантов картинки рецепта
+    (ключи - названия вариантов из recipes.images.VARIANTS).
+    Ещё не созданный вариант отдаётся ссылкой на
+    /api/recipes/{id}/image/{variant}/, которая создаёт его на месте.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+
+            return {}
+
+        request = self.context.get('request')
+        urls = {}
+        for variant in VARIANTS:
+            url = (image_variants.url(recipe.image.name, variant)
+                   or reverse('api:recipe-image-variant',
+                              kwargs={'pk': recipe.pk, 'variant': variant}))
+            urls[variant] = (request.build_absolute_uri(url)
+                             if request else url)
+
+        return urls
@@ -1,17 +1,41 @@
+from django.db.models import Case, Value, When
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
+from .constants import FUZZY_SEARCH_MODE, INGREDIENT_SEARCH_MODE_PARAM
+from recipes.constants import FUZZY_SEARCH_LIMIT
 from recipes.models import Ingredient, Recipe, Tag
 
 
 class IngredientFilter(SearchFilter):
-    """Фильтр поиска по полю name модели Ingredient."""
+    """
+    Фильтр поиска по полю name модели Ingredient.
+    В режиме mode=fuzzy ищет вхождение в любом месте названия,
+    начало названия ранжируется выше (без учёта опечаток:
+    их учитывает только индекс ингредиентов в памяти).
+    """
     search_param = 'name'
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def filter_queryset(self, request, queryset, view):
+        if (request.query_params.get(INGREDIENT_SEARCH_MODE_PARAM)
+                != FUZZY_SEARCH_MODE):
+
+            return super().filter_queryset(request, queryset, view)
+
+        name = request.query_params.get(self.search_param, '').strip()
+        if name:
+            queryset = (queryset.filter(name__icontains=name)
+                        .annotate(rank=Case(
+                            When(name__istartswith=name, then=Value(0)),
+                            default=Value(1)))
+                        .order_by('rank', 'name'))
+
+        return queryset[:FUZZY_SEARCH_LIMIT]
+
 
 class RecipeFilters(filters.FilterSet):
     """
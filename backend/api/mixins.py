@@ -0,0 +1,162 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .constants import RESPONSE_CACHE_KEY, RESPONSE_CACHE_TIMEOUT
+from core.prometheus import record_cache
+from core.versions import get_version, version_timestamp
+
+
+class EarlyResponseMixin:
+    """
+    Позволяет ответить на запрос прямо из initial(),
+    не вызывая обработчик действия (list, retrieve и т.д.).
+    """
+    def respond_early(self, request, response):
+        setattr(self, request.method.lower(),
+                lambda *args, **kwargs: response)
+
+
+class VersionedCacheMixin(EarlyResponseMixin):
+    """
+    Кэширует готовые (отрендеренные) JSON-ответы list и retrieve.
+    Ключ кэша содержит версию данных (cache_version_key),
+    которая меняется сигналами при любой записи,
+    поэтому правки из админки видны сразу, а попадание в кэш
+    не выполняет ни запросов к БД, ни сериализации DRF.
+    Бэкенд - кэш RESPONSE_CACHE_ALIAS (по умолчанию память процесса).
+    """
+    cache_version_key = None
+    cached_actions = ('list', 'retrieve')
+
+    def get_response_cache_key(self, request):
+        if (self.action not in self.cached_actions
+                or request.accepted_renderer.format != 'json'):
+
+            return None
+
+        return RESPONSE_CACHE_KEY.format(
+            version_key=self.cache_version_key,
+            version=get_version(self.cache_version_key),
+            path=hashlib.md5(request.get_full_path().encode()).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Версия читается до выполнения запроса к данным: если данные
+        # изменятся во время запроса, ответ закэшируется под старой версией.
+        self.response_cache_key = self.get_response_cache_key(request)
+        if not self.response_cache_key:
+
+            return
+
+        cached = caches[settings.RESPONSE_CACHE_ALIAS].get(
+            self.response_cache_key)
+        record_cache('response', cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            self.respond_early(
+                request, HttpResponse(content, content_type=content_type))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        # Ответ из кэша - обычный HttpResponse, повторно его не сохраняем.
+        if (getattr(self, 'response_cache_key', None)
+                and isinstance(response, Response)
+                and response.status_code == status.HTTP_200_OK):
+            response.render()
+            caches[settings.RESPONSE_CACHE_ALIAS].set(
+                self.response_cache_key,
+                (response.content, response['Content-Type']),
+                RESPONSE_CACHE_TIMEOUT)
+
+        return response
+
+
+class ConditionalGetMixin(EarlyResponseMixin):
+    """
+    Условные GET-запросы для действий из conditional_actions.
+    Валидаторы (ETag и Last-Modified) считаются методами get_etag
+    и get_last_modified без сериализации ответа.
+    На If-None-Match/If-Modified-Since с совпавшим валидатором
+    отвечает 304 без вызова обработчика, иначе добавляет
+    валидаторы в заголовки ответа 200.
+    Если ETag зависит от пользователя, ответ помечается Vary: Authorization.
+    """
+    conditional_actions = ('list', 'retrieve')
+    etag_depends_on_user = False
+
+    def get_etag(self, request):
+        """
+        Значение, однозначно определяющее тело ответа,
+        или None, если ETag не нужен.
+        """
+
+    def get_last_modified(self, request):
+        """
+        Момент последнего изменения ответа (aware datetime)
+        или None, если Last-Modified не нужен.
+        """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if (request.method not in ('GET', 'HEAD')
+                or self.action not in self.conditional_actions):
+
+            return
+
+        etag = self.get_etag(request)
+        if etag is not None:
+            self.etag = quote_etag(
+                hashlib.md5(str(etag).encode()).hexdigest())
+        last_modified = self.get_last_modified(request)
+        if last_modified is not None:
+            self.last_modified = int(last_modified.timestamp())
+
+        not_modified = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified)
+        if not_modified is not None:
+            self.respond_early(request, not_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        if response.status_code not in (status.HTTP_200_OK,
+                                        status.HTTP_304_NOT_MODIFIED):
+
+            return response
+
+        if getattr(self, 'etag', None):
+            response['ETag'] = self.etag
+        if getattr(self, 'last_modified', None):
+            response['Last-Modified'] = http_date(self.last_modified)
+        if self.etag_depends_on_user:
+            patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+
+class VersionedConditionalGetMixin(ConditionalGetMixin):
+    """
+    Условные GET-запросы для данных с версией (cache_version_key):
+    ETag строится из версии и запроса,
+    Last-Modified - момент создания версии.
+    """
+    cache_version_key = None
+
+    def get_etag(self, request):
+        return (get_version(self.cache_version_key),
+                request.get_host(),
+                request.get_full_path(),
+                request.accepted_renderer.format)
+
+    def get_last_modified(self, request):
+        return version_timestamp(get_version(self.cache_version_key))
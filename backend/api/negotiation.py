@@ -0,0 +1,12 @@
+from types import SimpleNamespace
+
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class IgnoreFormatParamNegotiation(DefaultContentNegotiation):
+    """
+    Выбор рендерера без учёта параметра ?format=.
+    Нужен эндпоинтам, где format означает формат скачиваемого файла,
+    а не формат ответа DRF.
+    """
+    settings = SimpleNamespace(URL_FORMAT_OVERRIDE=None)
@@ -1,4 +1,56 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .constants import (COUNT_CACHE_KEY, COUNT_CACHE_TIMEOUT,
+                        CURSOR_PAGINATION_PARAM, FEED_ORDERING)
+from core.prometheus import record_cache
+from core.versions import get_version
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк запроса планировщиком PostgreSQL (EXPLAIN),
+    без выполнения самого запроса.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация с параметром limit.
+    Страница выбирается условием по полям сортировки вместо OFFSET
+    и без COUNT(*), поэтому её стоимость не зависит от глубины.
+    Пустой параметр cursor означает первую страницу.
+    """
+    cursor_query_param = CURSOR_PAGINATION_PARAM
+    page_size_query_param = 'limit'
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+
+            return None
+
+        return super().decode_cursor(request)
+
+
+class FeedPagination(LimitCursorPagination):
+    """Курсорная пагинация ленты подписок по (-feed_pub_date, -id)."""
+    ordering = FEED_ORDERING
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -6,5 +58,122 @@ class PageLimitPagination(PageNumberPagination):
     Кастомный класс пагинации
     с дополнительным параметром page_size_query_param,
     позволяющим ограничить кол-во объектов на странице.
+    Если во вьюсете задан cursor_ordering, а в запросе
+    есть параметр cursor, пагинация переключается на курсорную
+    (ответ без count, ссылки next/previous содержат курсор).
     """
     page_size_query_param = 'limit'
+    cursor_pagination_class = LimitCursorPagination
+
+    def get_cursor_paginator(self, request, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if (ordering is None
+                or CURSOR_PAGINATION_PARAM not in request.query_params):
+
+            return None
+
+        paginator = self.cursor_pagination_class()
+        paginator.ordering = ordering
+
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self.get_cursor_paginator(request, view)
+        if self.cursor_paginator is None:
+
+            return super().paginate_queryset(queryset, request, view)
+
+        self.display_page_controls = True
+
+        return self.cursor_paginator.paginate_queryset(queryset,
+                                                       request,
+                                                       view)
+
+    def get_paginated_response(self, data):
+        if getattr(self, 'cursor_paginator', None) is None:
+
+            return super().get_paginated_response(data)
+
+        return self.cursor_paginator.get_paginated_response(data)
+
+    def to_html(self):
+        if getattr(self, 'cursor_paginator', None) is None:
+
+            return super().to_html()
+
+        return self.cursor_paginator.to_html()
+
+
+class CountedPaginator(Paginator):
+    """Paginator, который берёт count у пагинации DRF (см. get_count)."""
+    def __init__(self, object_list, per_page, pagination, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.pagination = pagination
+
+    @cached_property
+    def count(self):
+
+        return self.pagination.get_count(self.object_list)
+
+
+class CachedCountPagination(PageLimitPagination):
+    """
+    Пагинация с кэшируемым count.
+    count кэшируется на COUNT_CACHE_TIMEOUT по тексту запроса
+    (то есть по набору фильтров) и версиям из count_version_keys вьюсета,
+    поэтому запись в связанные таблицы сразу сбрасывает кэш.
+    На PostgreSQL, если планировщик оценивает выборку не меньше
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD строк, вместо точного COUNT(*)
+    отдаётся оценка.
+    Поле count_exact ответа сообщает, точный ли count.
+    """
+    def django_paginator_class(self, object_list, per_page):
+
+        return CountedPaginator(object_list, per_page, self)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_version_keys = getattr(view, 'count_version_keys', ())
+        self.count_exact = True
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        """Возвращает count из кэша или считает его (см. count_queryset)."""
+        queryset = queryset.order_by().values('pk')
+        sql, params = queryset.query.sql_with_params()
+        key = COUNT_CACHE_KEY.format(
+            versions=':'.join(get_version(key)
+                              for key in self.count_version_keys),
+            query=hashlib.md5(f'{sql}{params}'.encode()).hexdigest())
+        cached = cache.get(key)
+        record_cache('count', cached is not None)
+        if cached is None:
+            cached = self.count_queryset(queryset)
+            cache.set(key, cached, COUNT_CACHE_TIMEOUT)
+        count, self.count_exact = cached
+
+        return count
+
+    def count_queryset(self, queryset):
+        """Возвращает пару (count, точный ли он)."""
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        if threshold and connections[queryset.db].vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            if estimate >= threshold:
+
+                return estimate, False
+
+        return queryset.count(), True
+
+    def get_paginated_response(self, data):
+        if getattr(self, 'cursor_paginator', None) is not None:
+
+            return super().get_paginated_response(data)
+
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
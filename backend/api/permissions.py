@@ -1,6 +1,8 @@
 from rest_framework import permissions
 from rest_framework.permissions import SAFE_METHODS
 
+from .constants import LOCALHOST_ADDRESSES
+
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """Админу: полный доступ, остальным: только чтение."""
@@ -9,6 +11,14 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return request.method in SAFE_METHODS or request.user.is_staff
 
 
+class IsStaffOrLocalhost(permissions.BasePermission):
+    """Доступ админам и запросам с локального адреса."""
+    def has_permission(self, request, view):
+
+        return (request.user.is_staff
+                or request.META.get('REMOTE_ADDR') in LOCALHOST_ADDRESSES)
+
+
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """
     Автору объекта: полный доступ,
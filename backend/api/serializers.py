@@ -1,12 +1,20 @@
+import json
+
 from django.db import transaction
+from django.http import QueryDict
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from .constants import (COOKABLE_LIMIT, COOKABLE_MAX_INGREDIENTS,
+                        COOKABLE_MAX_LIMIT)
+from .fields import ImageVariantsField, UploadedImageField
+from .utils import get_subscribed_ids
 from .validators import ingredients_tags_in_recipe_validator
 from recipes.models import (Favorite, Ingredient, MeasureUnit, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
+from recipes.versions import (bump_recipe_ingredients,
+                              bump_shopping_carts_with_recipe)
 from users.models import CustomUser as User
 from users.models import Subscription
 
@@ -17,6 +25,8 @@ class CustomUserSerializer(UserSerializer):
     унаследованный от стандартного UserSerializer Djoser'а.
     Дополнительно выводит поле с информацией
     о наличии/отсутствии подписки на просматриваемого юзера.
+    Подписки пользователя запроса получаются один раз за запрос
+    (см. get_subscribed_ids).
     """
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -30,12 +40,8 @@ class CustomUserSerializer(UserSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-
-            return False
 
-        return Subscription.objects.filter(user=user, subscribing=obj).exists()
+        return obj.pk in get_subscribed_ids(self.context.get('request'))
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -106,11 +112,18 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 class RecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Recipe.
-    Поле image преобразовывает полученный base64 в картинку.
+    Поле image принимает картинку в base64 или файлом из multipart-формы;
+    в форме tags передаются повторяющимся полем,
+    а ingredients - JSON-строкой.
+    image_variants - ссылки на уменьшенные копии картинки (JPEG и WebP).
+    Поля is_favorited и is_in_shopping_cart берутся из аннотаций
+    queryset'а (Recipe.objects.with_user_flags), если они есть.
     Проверяет тэги и ингредиенты,
     а также правильно создаёт/обновляет m2m связи объекта.
+    При обновлении пишет в БД только то, что действительно изменилось.
     """
-    image = Base64ImageField()
+    image = UploadedImageField()
+    image_variants = ImageVariantsField()
     tags = TagSerializer(read_only=True, many=True)
     ingredients = RecipeIngredientSerializer(
         source='recipeingredient_set',
@@ -131,12 +144,41 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart',
                   'name',
                   'image',
+                  'image_variants',
                   'text',
                   'cooking_time')
 
+    def get_ingredients_and_tags(self):
+        """
+        Достаёт ingredients и tags из JSON или из multipart-формы.
+        Ингредиенты должны быть списком объектов с id и amount.
+        """
+        if not isinstance(self.initial_data, QueryDict):
+            ingredients = self.initial_data.get('ingredients')
+            tags = self.initial_data.get('tags')
+        else:
+            ingredients = self.initial_data.get('ingredients')
+            tags = self.initial_data.getlist('tags')
+            if ingredients:
+                try:
+                    ingredients = json.loads(ingredients)
+                except ValueError:
+                    raise serializers.ValidationError({'ingredients': (
+                        'В форме ingredients передаются JSON-строкой.')})
+
+        if ingredients and not (
+                isinstance(ingredients, list)
+                and all(isinstance(ingredient, dict)
+                        and 'id' in ingredient and 'amount' in ingredient
+                        for ingredient in ingredients)):
+            raise serializers.ValidationError({'ingredients': (
+                'Ингредиенты передаются списком объектов с полями '
+                'id и amount.')})
+
+        return ingredients, tags
+
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
-        tags = self.initial_data.get('tags')
+        ingredients, tags = self.get_ingredients_and_tags()
 
         ingredients_tags_in_recipe_validator(ingredients, tags)
 
@@ -151,6 +193,10 @@ class RecipeSerializer(serializers.ModelSerializer):
 
             return False
 
+        if hasattr(obj, 'is_favorited'):
+
+            return obj.is_favorited
+
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
@@ -159,6 +205,10 @@ class RecipeSerializer(serializers.ModelSerializer):
 
             return False
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+
+            return obj.is_in_shopping_cart
+
         return user.shopping_cart.filter(recipe=obj).exists()
 
     @transaction.atomic
@@ -180,16 +230,95 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
+    def update_ingredients(self, ingredients, recipe):
+        """
+        Приводит ингредиенты рецепта к запрошенным,
+        трогая только изменившиеся строки RecipeIngredient:
+        лишние удаляет, у оставшихся обновляет amount, новые создаёт.
+        Возвращает True, если что-то изменилось.
+        """
+        requested = {int(ingredient.get('id')): int(ingredient.get('amount'))
+                     for ingredient in ingredients}
+        existing = {recipe_ingredient.ingredient_id: recipe_ingredient
+                    for recipe_ingredient
+                    in RecipeIngredient.objects.filter(recipe=recipe)}
+
+        removed = [recipe_ingredient.pk
+                   for ingredient_id, recipe_ingredient in existing.items()
+                   if ingredient_id not in requested]
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+
+        changed = []
+        for ingredient_id, amount in requested.items():
+            recipe_ingredient = existing.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+
+        added = [{'id': ingredient_id, 'amount': amount}
+                 for ingredient_id, amount in requested.items()
+                 if ingredient_id not in existing]
+        if added:
+            self.create_ingredients(added, recipe)
+
+        # У строк RecipeIngredient нет сигналов, поэтому корзины
+        # с этим рецептом и состав рецептов инвалидируем здесь,
+        # один раз на рецепт. Индекс покрытия зависит только от набора
+        # ингредиентов, а не от их количества.
+        if removed or added:
+            bump_recipe_ingredients(recipe.pk)
+        elif changed:
+            bump_shopping_carts_with_recipe(recipe.pk)
+
+        return bool(removed or changed or added)
+
+    def update_tags(self, tags, recipe):
+        """
+        Приводит тэги рецепта к запрошенным.
+        Возвращает True, если набор тэгов изменился.
+        """
+        requested = {int(tag) for tag in tags}
+        existing = set(recipe.tags.values_list('id', flat=True))
+        if requested == existing:
+
+            return False
+
+        recipe.tags.set(requested)
+
+        return True
+
+    def field_changed(self, recipe, field, value):
+        """
+        Отличается ли новое значение поля от сохранённого.
+        Картинку фронтенд присылает при каждом PATCH, поэтому она
+        сравнивается по имени, под которым её сохранит хранилище
+        (хэш содержимого, см. ContentAddressedStorage).
+        """
+        if field != 'image':
+
+            return getattr(recipe, field) != value
+
+        image_field = Recipe._meta.get_field('image')
+
+        return recipe.image.name != image_field.storage.get_content_name(
+            image_field.generate_filename(recipe, value.name), value)
+
     @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = super().update(recipe, validated_data)
-        recipe.tags.clear()
-        recipe.tags.set(tags)
-        recipe.ingredients.clear()
-        self.create_ingredients(ingredients, recipe)
-        recipe.save()
+        changed_fields = [field for field, value in validated_data.items()
+                          if self.field_changed(recipe, field, value)]
+        tags_changed = self.update_tags(tags, recipe)
+        ingredients_changed = self.update_ingredients(ingredients, recipe)
+        if changed_fields or tags_changed or ingredients_changed:
+            for field in changed_fields:
+                setattr(recipe, field, validated_data[field])
+            recipe.save(update_fields=(*changed_fields, 'updated_at'))
 
         return recipe
 
@@ -198,14 +327,17 @@ class RecipeShortSerializer(serializers.ModelSerializer):
     """
     Сериализатор для краткого представления модели Recipe.
     Используется в других сериализаторах.
+    Вместе с оригиналом картинки отдаёт ссылки на её уменьшенные копии.
     """
-    image = Base64ImageField()
+    image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id',
                   'name',
                   'image',
+                  'image_variants',
                   'cooking_time')
 
 
@@ -231,11 +363,59 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         ]
 
 
+class CookableRecipeSerializer(RecipeShortSerializer):
+    """
+    Рецепт в ответе "что приготовить".
+    coverage - доля ингредиентов рецепта, которые есть у пользователя
+    (ставится вьюсетом), missing_ingredients - недостающие ингредиенты
+    (набор имеющихся передаётся в контексте как ingredients).
+    """
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = serializers.SerializerMethodField()
+
+    class Meta(RecipeShortSerializer.Meta):
+        fields = (*RecipeShortSerializer.Meta.fields,
+                  'coverage',
+                  'missing_ingredients')
+
+    def get_missing_ingredients(self, obj):
+        ingredients = self.context['ingredients']
+
+        return RecipeIngredientSerializer(
+            [recipe_ingredient
+             for recipe_ingredient in obj.recipeingredient_set.all()
+             if recipe_ingredient.ingredient_id not in ingredients],
+            many=True).data
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """
+    Проверяет query-параметры "что приготовить":
+    ingredients - id имеющихся ингредиентов (повторяющийся параметр),
+    limit - сколько рецептов вернуть.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=COOKABLE_MAX_INGREDIENTS)
+    limit = serializers.IntegerField(min_value=1,
+                                     max_value=COOKABLE_MAX_LIMIT,
+                                     default=COOKABLE_LIMIT)
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Проверяет query-параметр recipes_limit (целое число >= 1)."""
+    recipes_limit = serializers.IntegerField(min_value=1, required=False)
+
+
 class SubscriptionListSerializer(CustomUserSerializer):
     """
     Сериализатор представления Subsciption.
     Подтягивает количество рецептов и сами рецепты юзера,
-    на которого подписались.
+    на которого подписались (не больше recipes_limit из контекста).
+    recipes_count - счётчик рецептов автора (см. recipes.counters).
+    Если рецепты подгружены заранее (prefetch в limited_recipes),
+    запросов на каждого автора нет.
     """
     recipes_count = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
@@ -250,14 +430,13 @@ class SubscriptionListSerializer(CustomUserSerializer):
 
     def get_recipes_count(self, obj):
 
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()[:self.context.get('recipes_limit')]
         serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
 
         return serializer.data
@@ -291,6 +470,5 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
 
-        return SubscriptionListSerializer(
-            instance.subscribing,
-            context={'request': self.context.get('request')}).data
+        return SubscriptionListSerializer(instance.subscribing,
+                                          context=self.context).data
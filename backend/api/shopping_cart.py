@@ -0,0 +1,188 @@
+import csv
+import io
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from PIL import Image, ImageDraw, ImageFont
+
+from .constants import (DATE_FORMAT, PDF_FONT_SIZE, PDF_LINE_HEIGHT,
+                        PDF_MARGIN, PDF_PAGE_SIZE, PDF_RESOLUTION,
+                        SHOPPING_CART_CACHE_KEY, SHOPPING_CART_CACHE_TIMEOUT,
+                        SHOPPING_CART_ITERATOR_CHUNK_SIZE, STREAM_CHUNK_SIZE)
+from core.prometheus import record_cache
+from core.versions import get_version
+from recipes.constants import INGREDIENTS_VERSION_KEY
+from recipes.models import RecipeIngredient
+from recipes.units import unit_converter
+from recipes.versions import get_shopping_cart_version
+
+
+def shopping_cart_ingredients(user):
+    """
+    Один сгруппированный запрос: суммы ингредиентов из корзины
+    пользователя, переведённые в базовые единицы измерения
+    (количество * множитель единицы), по парам (ингредиент, базовая единица).
+    """
+    unit = 'ingredient__measurement_unit'
+
+    return (RecipeIngredient.objects
+            .filter(recipe__shopping_cart__user=user)
+            .values_list('ingredient__name',
+                         Coalesce(f'{unit}__base_unit__name',
+                                  f'{unit}__name'))
+            .annotate(amount=Sum(F('amount') * Coalesce(f'{unit}__factor',
+                                                        Value(1)),
+                                 output_field=DecimalField()))
+            .order_by('ingredient__name'))
+
+
+def shopping_cart_rows(user):
+    """
+    Отдаёт строки списка покупок пользователя:
+    (название ингредиента, количество, единица измерения),
+    количество переведено в самую удобную единицу.
+    Агрегированный результат кэшируется по версии корзины
+    и версии справочника ингредиентов, поэтому повторное скачивание
+    неизменившейся корзины не обращается к БД.
+    При промахе строки читаются из БД потоково (серверный курсор)
+    и попадают в кэш, когда отданы полностью.
+    """
+    key = SHOPPING_CART_CACHE_KEY.format(
+        user_id=user.pk,
+        cart_version=get_shopping_cart_version(user.pk),
+        ingredients_version=get_version(INGREDIENTS_VERSION_KEY))
+    rows = cache.get(key)
+    record_cache('shopping_cart', rows is not None)
+    if rows is not None:
+        yield from rows
+
+        return
+
+    rows = []
+    for name, base_unit, amount in shopping_cart_ingredients(user).iterator(
+            chunk_size=SHOPPING_CART_ITERATOR_CHUNK_SIZE):
+        row = (name, *unit_converter.humanize(amount, base_unit))
+        rows.append(row)
+        yield row
+    cache.set(key, rows, SHOPPING_CART_CACHE_TIMEOUT)
+
+
+def buffered(parts, size=STREAM_CHUNK_SIZE):
+    """Склеивает мелкие куски вывода в куски не меньше size символов."""
+    buffer = []
+    length = 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class TextShoppingCart:
+    """Список покупок обычным текстом."""
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+    binary = False
+
+    def render(self, title, rows):
+        yield f'{title}\n\n'
+        for name, amount, unit in rows:
+            yield f'- {name}: {amount} {unit}\n'
+        yield '\nКорзина собрана в FoodGram'
+
+
+class CSVShoppingCart:
+    """Список покупок в CSV (с BOM, чтобы Excel понял кодировку)."""
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+    binary = False
+
+    def render(self, title, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class PDFShoppingCart:
+    """
+    Список покупок в PDF.
+    Страницы рисуются средствами Pillow шрифтом SHOPPING_CART_PDF_FONT
+    (нужен TrueType-шрифт с кириллицей).
+    PDF собирается целиком и отдаётся кусками.
+    """
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    binary = True
+
+    def new_page(self):
+        page = Image.new('L', PDF_PAGE_SIZE, 'white')
+
+        return page, ImageDraw.Draw(page)
+
+    def render(self, title, rows):
+        # Шрифт загружается сразу, чтобы ошибка настройки всплыла
+        # до начала отдачи ответа, а не посреди потока.
+        font = ImageFont.truetype(settings.SHOPPING_CART_PDF_FONT,
+                                  PDF_FONT_SIZE)
+
+        return self.draw(font, title, rows)
+
+    def draw(self, font, title, rows):
+        lines = [title, '']
+        lines.extend(f'- {name}: {amount} {unit}'
+                     for name, amount, unit in rows)
+        lines.extend(('', 'Корзина собрана в FoodGram'))
+
+        pages = []
+        page, draw = self.new_page()
+        top = PDF_MARGIN
+        for line in lines:
+            if top + PDF_LINE_HEIGHT > PDF_PAGE_SIZE[1] - PDF_MARGIN:
+                pages.append(page)
+                page, draw = self.new_page()
+                top = PDF_MARGIN
+            draw.text((PDF_MARGIN, top), line, font=font, fill='black')
+            top += PDF_LINE_HEIGHT
+        pages.append(page)
+
+        output = io.BytesIO()
+        pages[0].save(output,
+                      format='PDF',
+                      save_all=True,
+                      append_images=pages[1:],
+                      resolution=PDF_RESOLUTION)
+        output.seek(0)
+        while chunk := output.read(STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+SHOPPING_CART_FORMATS = {
+    renderer.extension: renderer
+    for renderer in (TextShoppingCart(), CSVShoppingCart(), PDFShoppingCart())
+}
+
+
+def render_shopping_cart(user, renderer):
+    """Отдаёт файл списка покупок пользователя кусками."""
+    current_date = datetime.today().date().strftime(DATE_FORMAT)
+    title = (f'Корзина покупок для {user.get_full_name()} '
+             f'от {current_date}')
+    parts = renderer.render(title, shopping_cart_rows(user))
+    if renderer.binary:
+
+        return parts
+
+    return (chunk.encode() for chunk in buffered(parts))
@@ -0,0 +1,108 @@
+import io
+import itertools
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import (Favorite, Ingredient, MeasureUnit, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import CustomUser as User
+from users.models import Subscription
+
+MEDIA_ROOT = tempfile.mkdtemp()
+RECIPE_NUMBERS = itertools.count()
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def png_bytes(color='red'):
+    """Маленькая PNG-картинка для рецептов."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, 'PNG')
+
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    IMAGE_VARIANTS_WORKER=False,
+    QUERY_BUDGETS_STRICT=True,
+    CACHES={'default': {'BACKEND': LOCMEM_CACHE, 'LOCATION': 'default'},
+            'versions': {'BACKEND': LOCMEM_CACHE, 'LOCATION': 'versions'}})
+class FoodgramTestCase(APITestCase):
+    """
+    Общие данные для тестов API: единицы измерения, ингредиенты, тэги,
+    автор с подписчиком и рецепты с ингредиентами и тэгами.
+    Кэши - в памяти, картинки - во временной папке.
+    Бюджеты запросов (QUERY_BUDGETS) строгие: превышение
+    роняет тест с QueryBudgetError.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.units = [MeasureUnit.objects.get_or_create(name=name)[0]
+                     for name in ('г', 'мл', 'шт')]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_unit=cls.units[i % 3])
+            for i in range(10)]
+        cls.tags = [Tag.objects.create(name=f'тэг {i}',
+                                       color=f'#00000{i}',
+                                       slug=f'tag{i}')
+                    for i in range(3)]
+        cls.user = User.objects.create_user(email='user@example.org',
+                                            username='user',
+                                            first_name='Имя',
+                                            last_name='Фамилия',
+                                            password='password')
+        cls.author = User.objects.create_user(email='author@example.org',
+                                              username='author',
+                                              first_name='Имя',
+                                              last_name='Фамилия',
+                                              password='password')
+        Subscription.objects.create(user=cls.user, subscribing=cls.author)
+
+    def setUp(self):
+        # Кэши в памяти живут между тестами, а версии данных в тестах
+        # не меняются (bump_version срабатывает только после коммита).
+        caches['default'].clear()
+        caches['versions'].clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def create_recipes(cls, count, author=None, ingredients_count=3):
+        """
+        Создаёт count рецептов с ingredients_count ингредиентами
+        и двумя тэгами;
+        каждый второй - в избранном пользователя, каждый третий -
+        в его корзине.
+        """
+        recipes = []
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                name=f'рецепт {next(RECIPE_NUMBERS)}',
+                text='описание',
+                cooking_time=10,
+                author=author or cls.author,
+                image=SimpleUploadedFile('image.png', png_bytes(),
+                                         content_type='image/png'))
+            recipe.tags.set(cls.tags[:2])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe,
+                                 ingredient=cls.ingredients[(i + j) % 10],
+                                 amount=j + 1)
+                for j in range(ingredients_count))
+            if i % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if i % 3 == 0:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+            recipes.append(recipe)
+
+        return recipes
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from .base import FoodgramTestCase
+
+ME_URL = '/api/users/me/'
+LOGOUT_URL = '/api/auth/token/logout/'
+SET_PASSWORD_URL = '/api/users/set_password/'
+
+
+class CachedTokenAuthenticationTests(FoodgramTestCase):
+    """
+    Закэшированный токен перестаёт действовать сразу после выхода,
+    смены пароля или деактивации пользователя.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token = Token.objects.create(user=cls.user)
+        cls.author_token = Token.objects.create(user=cls.author)
+
+    def get_me(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        return self.client.get(ME_URL)
+
+    def token_queries(self, token):
+        """Запросы к таблице токенов при запросе с токеном token."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_me(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [query['sql'] for query in context.captured_queries
+                if 'authtoken_token' in query['sql']]
+
+    def test_token_is_cached(self):
+        self.assertTrue(self.token_queries(self.token))
+        self.assertEqual(self.token_queries(self.token), [])
+
+    def test_logout_rejects_token(self):
+        self.assertEqual(self.get_me(self.token).status_code,
+                         status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(LOGOUT_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_me(self.token).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.assertEqual(self.get_me(self.token).status_code,
+                         status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.get_me(self.token).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_password_rejected(self):
+        self.assertEqual(self.get_me(self.token).status_code,
+                         status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(SET_PASSWORD_URL,
+                                        {'current_password': 'password',
+                                         'new_password': 'n3w-Passw0rd!'})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # Закэшированный пользователь со старым паролем
+        # принял бы старый пароль ещё раз.
+        response = self.client.post(SET_PASSWORD_URL,
+                                    {'current_password': 'password',
+                                     'new_password': 'an0ther-Passw0rd!'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_tokens_stay_cached(self):
+        self.token_queries(self.token)
+        self.token_queries(self.author_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Другое'
+            self.user.save()
+        self.assertEqual(self.token_queries(self.author_token), [])
+        self.assertTrue(self.token_queries(self.token))
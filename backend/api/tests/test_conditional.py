@@ -0,0 +1,30 @@
+from rest_framework import status
+
+from .base import FoodgramTestCase
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeConditionalGetTests(FoodgramTestCase):
+    """Условные GET-запросы к отдельному рецепту."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+
+    def test_not_modified(self):
+        url = f'{RECIPES_URL}{self.recipe.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_pk_not_found(self):
+        for pk in ('abc', '999999'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'{RECIPES_URL}{pk}/')
+                self.assertEqual(response.status_code,
+                                 status.HTTP_404_NOT_FOUND)
+                self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,56 @@
+from rest_framework import status
+
+from .base import FoodgramTestCase
+from recipes.models import Favorite, Recipe
+from users.models import CustomUser as User
+from users.models import Subscription
+
+SET_PASSWORD_URL = '/api/users/set_password/'
+
+
+class CountersTests(FoodgramTestCase):
+    """
+    Счётчики меняются только UPDATE с F():
+    save() объекта с устаревшими значениями их не затирает.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+        cls.follower = User.objects.create_user(email='f@example.org',
+                                                username='follower',
+                                                first_name='Имя',
+                                                last_name='Фамилия',
+                                                password='password')
+
+    def test_user_save_keeps_counters(self):
+        author = User.objects.get(pk=self.author.pk)
+        Subscription.objects.create(user=self.follower,
+                                    subscribing=self.author)
+        author.first_name = 'Другое'
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.first_name, 'Другое')
+        self.assertEqual(author.followers_count, 2)
+        self.assertEqual(author.recipes_count, 1)
+
+    def test_set_password_keeps_counters(self):
+        self.client.force_authenticate(self.author)
+        Subscription.objects.create(user=self.follower,
+                                    subscribing=self.author)
+        response = self.client.post(SET_PASSWORD_URL,
+                                    {'current_password': 'password',
+                                     'new_password': 'n3w-Passw0rd!'})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.check_password('n3w-Passw0rd!'))
+        self.assertEqual(self.author.followers_count, 2)
+
+    def test_recipe_save_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.follower, recipe=self.recipe)
+        recipe.text = 'другое описание'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.text, 'другое описание')
+        self.assertEqual(recipe.favorites_count, 1)
@@ -0,0 +1,145 @@
+import base64
+import io
+import os
+import time
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from rest_framework import status
+
+from .base import FoodgramTestCase, png_bytes
+from recipes.constants import (IMAGE_GC_GRACE_PERIOD, IMAGE_VARIANTS_DIR,
+                               IMAGES_DIR)
+from recipes.images import (VARIANTS, image_storage, image_variants,
+                            variant_path)
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+class ContentAddressedImagesTests(FoodgramTestCase):
+    """
+    Картинки рецептов хранятся по хэшу содержимого:
+    повторно присланная картинка ничего не пишет.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+
+    def stored_files(self):
+        storage = Recipe._meta.get_field('image').storage
+
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(storage.path(IMAGES_DIR))
+            for name in names)
+
+    def test_same_content_is_stored_once(self):
+        storage = Recipe._meta.get_field('image').storage
+        files = self.stored_files()
+        name = storage.save(f'{IMAGES_DIR}/other.png',
+                            ContentFile(png_bytes()))
+        self.assertEqual(name, self.recipe.image.name)
+        self.assertEqual(self.stored_files(), files)
+
+    def test_resubmitted_image_writes_nothing(self):
+        self.client.force_authenticate(self.author)
+        files = self.stored_files()
+        updated_at = self.recipe.updated_at
+        response = self.client.patch(
+            f'{RECIPES_URL}{self.recipe.pk}/',
+            {'image': ('data:image/png;base64,'
+                       + base64.b64encode(png_bytes()).decode()),
+             'name': self.recipe.name,
+             'text': self.recipe.text,
+             'cooking_time': self.recipe.cooking_time,
+             'tags': [tag.pk for tag in self.tags[:2]],
+             'ingredients': [
+                 {'id': recipe_ingredient.ingredient_id,
+                  'amount': recipe_ingredient.amount}
+                 for recipe_ingredient
+                 in self.recipe.recipeingredient_set.all()]},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+        self.assertEqual(self.stored_files(), files)
+
+
+class ImageCollectionTests(FoodgramTestCase):
+    """
+    Картинки без ссылок удаляет только collect_images, и только
+    файлы старше IMAGE_GC_GRACE_PERIOD.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+
+    def setUp(self):
+        super().setUp()
+        # У всех рецептов одна и та же картинка, а файлы, удалённые
+        # в других тестах, не возвращаются откатом транзакции.
+        image_storage().save(f'{IMAGES_DIR}/image.png',
+                             ContentFile(png_bytes()))
+
+    def age(self, storage, name):
+        """Делает файл старше срока, после которого его можно удалить."""
+        old = time.time() - IMAGE_GC_GRACE_PERIOD - 60
+        os.utime(storage.path(name), (old, old))
+
+    def collect(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('collect_images', stdout=io.StringIO())
+
+    def delete_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+
+    def test_deleted_recipe_image_is_collected(self):
+        name = self.recipe.image.name
+        self.delete_recipe()
+        self.assertTrue(image_storage().exists(name))
+        self.collect()
+        self.assertTrue(image_storage().exists(name))
+        self.age(image_storage(), name)
+        self.collect()
+        self.assertFalse(image_storage().exists(name))
+
+    def test_resubmitted_image_survives_collection(self):
+        name = self.recipe.image.name
+        self.delete_recipe()
+        self.age(image_storage(), name)
+        self.assertEqual(image_storage().save(f'{IMAGES_DIR}/again.png',
+                                              ContentFile(png_bytes())),
+                         name)
+        self.collect()
+        self.assertTrue(image_storage().exists(name))
+
+    def test_collected_variants_are_forgotten(self):
+        name = self.recipe.image.name
+        image_variants.generate(name)
+        paths = [variant_path(name, variant) for variant in VARIANTS]
+        self.assertTrue(all(image_variants.exists(path) for path in paths))
+        self.delete_recipe()
+        for path in paths:
+            self.age(default_storage, path)
+        self.collect()
+        self.assertFalse(any(image_variants.exists(path) for path in paths))
+
+    def test_concurrent_variant_writes_overwrite(self):
+        name = self.recipe.image.name
+        path = variant_path(name, 'small_webp')
+        # Оба generate успели решить, что вариантов ещё нет.
+        with mock.patch.object(image_variants, 'exists',
+                               return_value=False):
+            image_variants.generate(name)
+            image_variants.generate(name)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.assertEqual([file_name for file_name
+                          in default_storage.listdir(IMAGE_VARIANTS_DIR)[1]
+                          if file_name.startswith(stem)],
+                         [os.path.basename(path)])
@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from .base import FoodgramTestCase
+from recipes.management.commands.import_data import JsonArrayReader
+from recipes.models import Ingredient
+
+ROWS = [{'name': 'мука', 'measurement_unit': 'г'},
+        {'name': 'вода', 'measurement_unit': 'стакан'},
+        {'name': 'имбирь', 'measurement_unit': 'корень'}]
+
+
+class CountingReader(io.StringIO):
+    """StringIO, который считает прочитанные символы."""
+    read_chars = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.read_chars += len(chunk)
+
+        return chunk
+
+
+class JsonArrayReaderTests(SimpleTestCase):
+    """Потоковое чтение json-массива кусками любого размера."""
+    def read(self, text, chunk_size=4):
+        return list(JsonArrayReader(io.StringIO(text), chunk_size))
+
+    def test_elements_across_chunks(self):
+        text = json.dumps([*ROWS, 12345, 'строка', True, None, [1, 2]],
+                          ensure_ascii=False, indent=2)
+        for chunk_size in (1, 3, 7, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.read(text, chunk_size),
+                                 json.loads(text))
+
+    def test_empty_array(self):
+        self.assertEqual(self.read(' [ ] '), [])
+
+    def test_malformed(self):
+        for text, message in (
+                ('{"a": 1}', 'json-массив'),
+                ('[{"a": 1} {"a": 2}]', 'символ 10'),
+                ('[{"a": 1},, {"a": 2}]', 'символ 10'),
+                ('[{"a": 1}, ]', 'символ 11'),
+                ('[1, {oops}, 2]', 'символ 5'),
+                ('[{"a": 1},', 'оборвался'),
+                ('[{"a": 1}', 'оборвался'),
+                ('[{"a": "', 'символ 7')):
+            with self.subTest(text=text):
+                with self.assertRaisesMessage(CommandError, message):
+                    self.read(text)
+
+    def test_bad_element_fails_early(self):
+        file = CountingReader('[{"a": 1}, {oops}, '
+                              + ', '.join(['{"a": 1}'] * 10000) + ']')
+        with self.assertRaisesMessage(CommandError, 'символ 12'):
+            list(JsonArrayReader(file, chunk_size=64))
+        self.assertLess(file.read_chars, 1000)
+
+
+class ImportDataTests(FoodgramTestCase):
+    """Команда import_data: json, csv, --dry-run и ошибки в данных."""
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+
+        return path
+
+    def import_data(self, path, *args):
+        output = io.StringIO()
+        call_command('import_data', path, *args, stdout=output)
+
+        return output.getvalue()
+
+    def imported(self):
+        return set(Ingredient.objects
+                   .filter(name__in=[row['name'] for row in ROWS])
+                   .values_list('name', 'measurement_unit__name'))
+
+    def expected(self):
+        return {(row['name'], row['measurement_unit']) for row in ROWS}
+
+    def test_json(self):
+        path = self.write('ingredients.json',
+                          json.dumps(ROWS, ensure_ascii=False))
+        output = self.import_data(path, '--batch-size', '2')
+        self.assertEqual(self.imported(), self.expected())
+        self.assertIn('Добавлено: 3', output)
+        # Повторный импорт не создаёт дубликатов.
+        self.assertIn('Добавлено: 0', self.import_data(path))
+
+    def test_csv(self):
+        path = self.write('ingredients.csv', ''.join(
+            f'{row["name"]},{row["measurement_unit"]}\n' for row in ROWS))
+        self.import_data(path)
+        self.assertEqual(self.imported(), self.expected())
+
+    def test_dry_run(self):
+        path = self.write('ingredients.json',
+                          json.dumps(ROWS, ensure_ascii=False))
+        output = self.import_data(path, '--dry-run')
+        self.assertEqual(self.imported(), set())
+        self.assertIn('Всего записей: 3', output)
+
+    def test_bad_records_are_skipped(self):
+        path = self.write('ingredients.json', json.dumps(
+            [*ROWS, {'name': 'соль'}, 'не объект', {'measurement_unit': 'г'}],
+            ensure_ascii=False))
+        output = self.import_data(path)
+        self.assertEqual(self.imported(), self.expected())
+        self.assertIn('Количество ошибок: 3', output)
+
+    def test_malformed_json(self):
+        path = self.write('ingredients.json',
+                          '[{"name": "мука", "measurement_unit": "г"} '
+                          '{"name": "вода", "measurement_unit": "мл"}]')
+        with self.assertRaisesMessage(CommandError, 'символ 43'):
+            self.import_data(path)
+
+    def test_unknown_format(self):
+        path = self.write('ingredients.xml', '')
+        with self.assertRaisesMessage(CommandError, 'Неизвестный формат'):
+            self.import_data(path)
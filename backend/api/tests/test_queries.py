@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from .base import FoodgramTestCase
+from core.metrics import QueryBudgetError
+
+RECIPES_URL = '/api/recipes/'
+# count, страница рецептов (с автором и флагами пользователя),
+# тэги, ингредиенты с единицами измерения и подписки пользователя
+# (для is_subscribed автора).
+RECIPES_LIST_QUERIES = 5
+
+
+class RecipeQueriesTests(FoodgramTestCase):
+    """
+    Число запросов к БД у рецептов не зависит от размера страницы
+    и числа ингредиентов: флаги is_favorited/is_in_shopping_cart
+    приходят аннотациями, связанные объекты - select/prefetch_related
+    (Recipe.objects.with_related).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = cls.create_recipes(100)
+        cls.big_recipe = cls.create_recipes(1, ingredients_count=10)[0]
+
+    def count_queries(self, url, params=None):
+        self.setUp()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return len(context.captured_queries)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries(self):
+        for limit in (6, 100):
+            with self.subTest(limit=limit):
+                self.setUp()
+                with self.assertNumQueries(RECIPES_LIST_QUERIES):
+                    response = self.client.get(RECIPES_URL,
+                                               {'limit': limit})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+                self.assertTrue(any(recipe['is_favorited']
+                                    for recipe in response.data['results']))
+                self.assertTrue(any(recipe['is_in_shopping_cart']
+                                    for recipe in response.data['results']))
+
+    def test_list_queries_flat(self):
+        self.assertEqual(self.count_queries(RECIPES_URL, {'limit': 6}),
+                         self.count_queries(RECIPES_URL, {'limit': 100}))
+
+    def test_detail_queries_flat(self):
+        self.assertEqual(
+            self.count_queries(f'{RECIPES_URL}{self.recipes[0].pk}/'),
+            self.count_queries(f'{RECIPES_URL}{self.big_recipe.pk}/'))
+
+    def test_delete_queries_flat(self):
+        self.client.force_authenticate(self.author)
+        counts = []
+        for recipe in (self.recipes[0], self.big_recipe):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.delete(f'{RECIPES_URL}{recipe.pk}/')
+            self.assertEqual(response.status_code,
+                             status.HTTP_204_NO_CONTENT)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_query_budget_is_strict(self):
+        with override_settings(
+                QUERY_BUDGETS={'RecipeViewSet.list': {'queries': 1}}):
+            with self.assertRaises(QueryBudgetError):
+                self.client.get(RECIPES_URL)
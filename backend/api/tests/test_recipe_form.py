@@ -0,0 +1,42 @@
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+
+from .base import FoodgramTestCase, png_bytes
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeFormTests(FoodgramTestCase):
+    """
+    Создание рецепта multipart-формой:
+    ingredients в форме передаются JSON-строкой.
+    """
+    def post_form(self, ingredients):
+        self.client.force_authenticate(self.user)
+
+        return self.client.post(
+            RECIPES_URL,
+            {'image': SimpleUploadedFile('photo.png', png_bytes(),
+                                         content_type='image/png'),
+             'name': 'рецепт из формы',
+             'text': 'текст',
+             'cooking_time': 10,
+             'tags': [tag.pk for tag in self.tags[:2]],
+             'ingredients': ingredients},
+            format='multipart')
+
+    def test_form_creates_recipe(self):
+        response = self.post_form(json.dumps(
+            [{'id': self.ingredients[0].pk, 'amount': 100}]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_malformed_ingredients_bad_request(self):
+        for ingredients in ('{"id": 1}', '[1, 2]', '"id"',
+                            '[{"id": 1}]', 'not json'):
+            with self.subTest(ingredients=ingredients):
+                response = self.post_form(ingredients)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.assertIn('ingredients', response.data)
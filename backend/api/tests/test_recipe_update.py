@@ -0,0 +1,85 @@
+import base64
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from .base import FoodgramTestCase, png_bytes
+from recipes.models import Recipe
+from recipes.versions import get_shopping_cart_version
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeUpdateTests(FoodgramTestCase):
+    """PATCH рецепта пишет в БД только то, что изменилось."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+        self.url = f'{RECIPES_URL}{self.recipe.pk}/'
+
+    def get_payload(self, color='red', **kwargs):
+        """Рецепт в том виде, в каком его присылает фронтенд."""
+        payload = {
+            'name': self.recipe.name,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [tag.pk for tag in self.recipe.tags.all()],
+            'ingredients': [
+                {'id': recipe_ingredient.ingredient_id,
+                 'amount': recipe_ingredient.amount}
+                for recipe_ingredient
+                in self.recipe.recipeingredient_set.all()],
+            'image': ('data:image/png;base64,'
+                      + base64.b64encode(png_bytes(color)).decode()),
+        }
+        payload.update(kwargs)
+
+        return payload
+
+    def patch(self, payload):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [query['sql'] for query in context.captured_queries
+                if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+
+    def test_same_image_writes_nothing(self):
+        updated_at = self.recipe.updated_at
+        self.assertEqual(self.patch(self.get_payload()), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+
+    def test_changed_fields_are_saved(self):
+        image = self.recipe.image.name
+        self.assertTrue(self.patch(self.get_payload(color='blue',
+                                                    cooking_time=42)))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.cooking_time, 42)
+        self.assertNotEqual(self.recipe.image.name, image)
+        self.assertTrue(Recipe.objects.filter(pk=self.recipe.pk,
+                                              cooking_time=42).exists())
+
+    def test_removed_ingredients_are_one_delete(self):
+        ingredients = self.get_payload()['ingredients']
+        writes = self.patch(self.get_payload(ingredients=ingredients[:1]))
+        self.assertEqual(len([sql for sql in writes
+                              if sql.startswith('DELETE')]), 1)
+        self.assertEqual(self.recipe.recipeingredient_set.count(), 1)
+
+    def test_ingredients_change_bumps_cart_version(self):
+        ingredients = self.get_payload()['ingredients']
+        ingredients[0]['amount'] += 1
+        for payload in (self.get_payload(ingredients=ingredients),
+                        self.get_payload(ingredients=ingredients[:1])):
+            version = get_shopping_cart_version(self.user.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.patch(payload)
+            self.assertNotEqual(get_shopping_cart_version(self.user.pk),
+                                version)
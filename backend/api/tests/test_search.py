@@ -0,0 +1,107 @@
+from rest_framework import status
+
+from .base import FoodgramTestCase
+from recipes.models import Ingredient
+
+INGREDIENTS_URL = '/api/ingredients/'
+COOKABLE_URL = '/api/recipes/cookable/'
+
+
+class IngredientSearchTests(FoodgramTestCase):
+    """
+    Поиск ингредиентов по индексу в памяти процесса:
+    по началу названия и ранжированный (mode=fuzzy).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ('Сахар', 'сахарная пудра', 'ванильный сахар',
+                     'ежевика', 'соль'):
+            Ingredient.objects.create(name=name,
+                                      measurement_unit=cls.units[0])
+
+    def search(self, name, **params):
+        response = self.client.get(INGREDIENTS_URL, {'name': name, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_list(self):
+        self.assertEqual(self.search(''),
+                         list(Ingredient.objects.values_list('name',
+                                                             flat=True)))
+
+    def test_prefix(self):
+        self.assertEqual(
+            self.search('сах'),
+            list(Ingredient.objects
+                 .filter(name__in=('Сахар', 'сахарная пудра'))
+                 .values_list('name', flat=True)))
+        self.assertEqual(self.search('ЁЖ'), ['ежевика'])
+        self.assertEqual(self.search('пудра'), [])
+
+    def test_fuzzy_ranking(self):
+        names = self.search('сахар', mode='fuzzy')
+        self.assertEqual(set(names[:2]), {'Сахар', 'сахарная пудра'})
+        self.assertEqual(names[2], 'ванильный сахар')
+
+    def test_fuzzy_typo(self):
+        self.assertIn('Сахар', self.search('сахр', mode='fuzzy'))
+        self.assertNotIn('соль', self.search('сахр', mode='fuzzy'))
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.search('мёд'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='мёд',
+                                      measurement_unit=self.units[0])
+        self.assertEqual(self.search('мед'), ['мёд'])
+
+
+class CookableTests(FoodgramTestCase):
+    """Рецепты по покрытию набора ингредиентов (/api/recipes/cookable/)."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Ингредиенты рецептов: 0, 1, 2 / 1, 2, 3 / 2, 3, 4.
+        cls.recipes = cls.create_recipes(3)
+
+    def cookable(self, ingredients, **params):
+        return self.client.get(COOKABLE_URL, {
+            'ingredients': [self.ingredients[i].pk for i in ingredients],
+            **params})
+
+    def test_ranking(self):
+        response = self.cookable((0, 1, 2))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([recipe['id'] for recipe in response.data['results']],
+                         [recipe.pk for recipe in self.recipes])
+        self.assertEqual([round(recipe['coverage'], 2)
+                          for recipe in response.data['results']],
+                         [1, 0.67, 0.33])
+        self.assertEqual(
+            [ingredient['id'] for ingredient
+             in response.data['results'][1]['missing_ingredients']],
+            [self.ingredients[3].pk])
+
+    def test_limit(self):
+        response = self.cookable((0, 1, 2), limit=1)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([recipe['id'] for recipe in response.data['results']],
+                         [self.recipes[0].pk])
+
+    def test_deleted_recipe_skipped(self):
+        self.cookable((0,))
+        # Индекс ещё не знает об удалении (версия меняется после коммита).
+        self.recipes[0].delete()
+        response = self.cookable((0,))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_params(self):
+        for params in ({}, {'ingredients': 'abc'},
+                       {'ingredients': self.ingredients[0].pk, 'limit': 0}):
+            with self.subTest(params=params):
+                response = self.client.get(COOKABLE_URL, params)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
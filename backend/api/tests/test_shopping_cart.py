@@ -0,0 +1,82 @@
+import csv
+import io
+
+from rest_framework import status
+
+from .base import FoodgramTestCase
+from recipes.models import Ingredient, MeasureUnit, RecipeIngredient
+from recipes.units import unit_converter
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class UnitConverterTests(FoodgramTestCase):
+    """Количество в базовых единицах показывается в удобной единице."""
+    def test_humanize(self):
+        for amount, base_unit, expected in (
+                (1500, 'г', ('1.5', 'кг')),
+                (2000, 'г', ('2', 'кг')),
+                (1234, 'г', ('1234', 'г')),
+                (500, 'г', ('500', 'г')),
+                ('1.234', 'г', ('1.23', 'г')),
+                (2500, 'мл', ('2.5', 'л')),
+                (100, 'мл', ('100', 'мл')),
+                (200, 'мл', ('200', 'мл')),
+                (300, 'мл', ('300', 'мл')),
+                (45, 'мл', ('3', 'ст. л.')),
+                (20, 'мл', ('4', 'ч. л.')),
+                ('7.5', 'мл', ('1.5', 'ч. л.')),
+                (50, 'мл', ('50', 'мл')),
+                ('0.5', 'мл', ('0.5', 'мл')),
+                (3, 'шт', ('3', 'шт'))):
+            with self.subTest(amount=amount, base_unit=base_unit):
+                self.assertEqual(unit_converter.humanize(amount, base_unit),
+                                 expected)
+
+
+class ShoppingCartDownloadTests(FoodgramTestCase):
+    """Скачивание списка покупок в txt, csv и pdf."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        recipes = cls.create_recipes(2, ingredients_count=0)
+        sugar = Ingredient.objects.create(
+            name='сахар', measurement_unit=MeasureUnit.objects.get(name='кг'))
+        oil = Ingredient.objects.create(
+            name='масло',
+            measurement_unit=MeasureUnit.objects.get(name='ст. л.'))
+        # Корзина: только первый рецепт (см. create_recipes).
+        RecipeIngredient.objects.bulk_create((
+            RecipeIngredient(recipe=recipes[0], ingredient=sugar, amount=2),
+            RecipeIngredient(recipe=recipes[0], ingredient=oil, amount=2),
+            RecipeIngredient(recipe=recipes[1], ingredient=oil, amount=5)))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(DOWNLOAD_URL, {'format': file_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return b''.join(response.streaming_content)
+
+    def test_txt(self):
+        content = self.download('txt').decode()
+        self.assertIn('- масло: 2 ст. л.\n', content)
+        self.assertIn('- сахар: 2 кг\n', content)
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(
+            self.download('csv').decode('utf-8-sig'))))
+        self.assertEqual(rows, [
+            ['Ингредиент', 'Количество', 'Единица измерения'],
+            ['масло', '2', 'ст. л.'],
+            ['сахар', '2', 'кг']])
+
+    def test_pdf(self):
+        self.assertTrue(self.download('pdf').startswith(b'%PDF'))
+
+    def test_unknown_format(self):
+        response = self.client.get(DOWNLOAD_URL, {'format': 'doc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
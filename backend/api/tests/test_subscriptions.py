@@ -0,0 +1,32 @@
+from rest_framework import status
+
+from .base import FoodgramTestCase
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTests(FoodgramTestCase):
+    """Список подписок /api/users/subscriptions/."""
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipes(5)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_subscriptions(self):
+        response = self.client.get(SUBSCRIPTIONS_URL,
+                                   {'recipes_limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        author = response.data['results'][0]
+        self.assertEqual(author['id'], self.author.pk)
+        self.assertEqual(author['recipes_count'], 5)
+        self.assertEqual(len(author['recipes']), 2)
+
+    def test_invalid_recipes_limit(self):
+        response = self.client.get(SUBSCRIPTIONS_URL,
+                                   {'recipes_limit': 0})
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
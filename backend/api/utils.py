@@ -0,0 +1,33 @@
+from users.models import Subscription
+
+SUBSCRIBED_IDS_ATTR = '_subscribed_ids'
+
+
+def get_subscribed_ids(request):
+    """
+    Возвращает множество id авторов,
+    на которых подписан пользователь из запроса.
+    Множество получается одним запросом к БД и запоминается на объекте
+    request, поэтому все сериализаторы в рамках одного запроса
+    (автор рецепта, список пользователей, подписки)
+    отвечают на is_subscribed из памяти.
+    Для анонима возвращает пустое множество без обращения к БД.
+    """
+    if request is None or request.user.is_anonymous:
+
+        return frozenset()
+
+    subscribed_ids = getattr(request, SUBSCRIBED_IDS_ATTR, None)
+    if subscribed_ids is None:
+        subscribed_ids = frozenset(
+            Subscription.objects.filter(user=request.user)
+            .values_list('subscribing_id', flat=True))
+        setattr(request, SUBSCRIBED_IDS_ATTR, subscribed_ids)
+
+    return subscribed_ids
+
+
+def reset_subscribed_ids(request):
+    """Сбрасывает запомненное множество подписок после их изменения."""
+    if hasattr(request, SUBSCRIBED_IDS_ATTR):
+        delattr(request, SUBSCRIBED_IDS_ATTR)
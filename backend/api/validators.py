@@ -11,6 +11,8 @@ def ingredients_tags_in_recipe_validator(ingredients, tags):
     - отстутствия ингредиентов или тэгов в БД
     - использования повторяющихся ингредиентов/тэгов в запросе
     - количества ингредиента <= 0.
+    Существование проверяется одним запросом id__in на модель,
+    повторы ищутся по множеству id.
     """
     if not ingredients:
         raise serializers.ValidationError({'ingredients': (
@@ -19,36 +21,39 @@ def ingredients_tags_in_recipe_validator(ingredients, tags):
         raise serializers.ValidationError({'tags': (
             'Укажите хотя бы один тэг.')})
 
-    ingredients_list = []
+    ingredient_ids = set()
     for cur_ingredient in ingredients:
-        try:
-            ingredient = Ingredient.objects.get(id=cur_ingredient['id'])
-        except Ingredient.DoesNotExist:
-            raise serializers.ValidationError({'ingredients': (
-                f'Ингредиент с id {cur_ingredient["id"]} не существует.')})
-
-        if ingredient in ingredients_list:
+        ingredient_id = int(cur_ingredient['id'])
+        if ingredient_id in ingredient_ids:
             raise serializers.ValidationError({'ingredients': (
                 f'Ингредиенты в рецепте не могут повторяться '
-                f'(ID - {ingredient.id}).')})
+                f'(ID - {ingredient_id}).')})
 
-        ingredients_list.append(ingredient)
+        ingredient_ids.add(ingredient_id)
 
         if int(cur_ingredient.get('amount')) <= 0:
             raise serializers.ValidationError({'ingredients': (
                 f'Количество ингредиента c id {cur_ingredient["id"]} '
                 'не может быть меньше или равно 0.')})
 
-    tags_list = []
+    missing_ids = ingredient_ids - set(
+        Ingredient.objects.filter(id__in=ingredient_ids)
+        .values_list('id', flat=True))
+    if missing_ids:
+        raise serializers.ValidationError({'ingredients': (
+            f'Ингредиент с id {min(missing_ids)} не существует.')})
+
+    tag_ids = set()
     for cur_tag in tags:
-        try:
-            tag = Tag.objects.get(id=cur_tag)
-        except Tag.DoesNotExist:
+        tag_id = int(cur_tag)
+        if tag_id in tag_ids:
             raise serializers.ValidationError({'tags': (
-                f'Тэг с id {cur_tag} не существует.')})
+                f'Тэги не могут повторяться (ID - {tag_id}).')})
 
-        if tag in tags_list:
-            raise serializers.ValidationError({'tags': (
-                f'Тэги не могут повторяться (ID - {tag.id}).')})
+        tag_ids.add(tag_id)
 
-        tags_list.append(tag)
+    missing_ids = tag_ids - set(
+        Tag.objects.filter(id__in=tag_ids).values_list('id', flat=True))
+    if missing_ids:
+        raise serializers.ValidationError({'tags': (
+            f'Тэг с id {min(missing_ids)} не существует.')})
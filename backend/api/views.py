@@ -1,47 +1,91 @@
-from datetime import datetime
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import F, Prefetch
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .constants import DATE_FORMAT
+from .constants import (FUZZY_SEARCH_MODE, INGREDIENT_SEARCH_MODE_PARAM,
+                        POPULAR_RECIPES_ORDERING, RECIPES_CURSOR_ORDERING,
+                        SHOPPING_CART_FORMAT_PARAM, USERS_CURSOR_ORDERING)
 from .filters import IngredientFilter, RecipeFilters
-from .paginators import PageLimitPagination
-from .permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from .serializers import (FavoriteSerializer, IngredientSerializer,
+from .mixins import (ConditionalGetMixin, VersionedCacheMixin,
+                     VersionedConditionalGetMixin)
+from .negotiation import IgnoreFormatParamNegotiation
+from .paginators import CachedCountPagination, FeedPagination
+from .permissions import (IsAdminOrReadOnly, IsAuthorOrReadOnly,
+                          IsStaffOrLocalhost)
+from .serializers import (CookableQuerySerializer, CookableRecipeSerializer,
+                          FavoriteSerializer, IngredientSerializer,
                           RecipeSerializer, RecipeShortSerializer,
-                          ShoppingCartSerializer, SubscriptionSerializer,
+                          RecipesLimitSerializer, ShoppingCartSerializer,
+                          SubscriptionListSerializer, SubscriptionSerializer,
                           TagSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from .shopping_cart import (SHOPPING_CART_FORMATS, TextShoppingCart,
+                            render_shopping_cart)
+from .utils import get_subscribed_ids, reset_subscribed_ids
+from core.prometheus import export_metrics
+from core.versions import get_version, version_timestamp
+from recipes.constants import (INGREDIENTS_VERSION_KEY, RECIPES_VERSION_KEY,
+                               TAGS_VERSION_KEY)
+from recipes.feeds import filter_feed
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.images import VARIANTS, image_variants
+from recipes.search import ingredient_index, recipe_coverage_index
 from users.models import CustomUser as User
+from users.constants import SUBSCRIPTIONS_VERSION_KEY, USERS_VERSION_KEY
 from users.models import Subscription
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(VersionedConditionalGetMixin,
+                        VersionedCacheMixin,
+                        viewsets.ModelViewSet):
     """
     Вьюсет для /api/ingredients/*.
     Доступен для чтения всем, для ред-я и создания: только админу.
-    Позволяет производить поиск по вхождению в начало поля name.
+    Позволяет производить поиск по вхождению в начало поля name,
+    а с параметром mode=fuzzy - ранжированный поиск
+    (начало названия, начало слова, похожие названия с опечатками).
+    При включённой настройке INGREDIENT_SEARCH_INDEX список и поиск
+    отдаются из индекса в памяти процесса без обращения к БД.
+    Готовые ответы кэшируются до изменения справочника ингредиентов,
+    на условные запросы (ETag/Last-Modified) отвечает 304.
     """
-    queryset = Ingredient.objects.all()
+    cache_version_key = INGREDIENTS_VERSION_KEY
+    queryset = Ingredient.objects.select_related('measurement_unit')
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_SEARCH_INDEX:
+
+            return super().list(request, *args, **kwargs)
+
+        name = request.query_params.get(IngredientFilter.search_param, '')
+        if (request.query_params.get(INGREDIENT_SEARCH_MODE_PARAM)
+                == FUZZY_SEARCH_MODE):
+
+            return Response(ingredient_index.search_fuzzy(name))
 
-class RecipeViewSet(viewsets.ModelViewSet):
+        return Response(ingredient_index.search(name))
+
+
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Вьюсет для /api/recipes/*.
     Доступен для чтения всем, для ред-я автору объекта или админу.
     Создавать объект могут только аутентифицированные.
+    Рецепт принимается в JSON (картинка в base64)
+    или в multipart/form-data (картинка файлом).
     Фильтруется по:
     - выбору из предустановленных поля tags,
     - по булеву значению полей is_favorited и is_in_shopping_cart(1 или 0).
@@ -50,14 +94,86 @@ class RecipeViewSet(viewsets.ModelViewSet):
     shopping_cart - добавить/удалить рецепт в/из корзину(ы) покупок,
     download_shopping_cart - скачать список ингредиентов
     для всех рецептов в корзине покупок.
+    image/{variant} - редирект на уменьшенную копию картинки
+    (доступен всем, создаёт копию, если её ещё нет).
+    popular - рецепты по убыванию рейтинга популярности
+    (доступен всем, с теми же фильтрами, что и список).
+    feed - лента рецептов авторов из подписок, от новых к старым
+    (для аутентифицированных, курсорная пагинация).
+    cookable - "что приготовить": рецепты по доле ингредиентов,
+    которые есть у пользователя, с недостающими ингредиентами
+    (доступен всем).
+    Для отдельного рецепта поддерживаются условные запросы:
+    ETag учитывает и поля, зависящие от пользователя
+    (is_favorited, is_in_shopping_cart, is_subscribed автора),
+    Last-Modified отдаётся только анониму.
+    С параметром cursor список отдаётся курсорной пагинацией
+    по (-pub_date, -id), иначе count списка кэшируется
+    до изменения рецептов, избранного или корзин.
     """
-    queryset = Recipe.objects.prefetch_related('tags', 'ingredients')
+    conditional_actions = ('retrieve',)
+    etag_depends_on_user = True
+    queryset = Recipe.objects.with_related()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrReadOnly | IsAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilters
-    pagination_class = PageLimitPagination
+    parser_classes = (JSONParser, MultiPartParser)
+    pagination_class = CachedCountPagination
+    cursor_ordering = RECIPES_CURSOR_ORDERING
+    count_version_keys = (RECIPES_VERSION_KEY,)
+
+    def get_queryset(self):
+
+        return (super().get_queryset()
+                .with_user_flags(self.request.user))
+
+    def get_etag(self, request):
+        """
+        Валидатор рецепта считается одним лёгким запросом
+        (время изменения, автор и флаги пользователя)
+        плюс версии тэгов, ингредиентов и пользователей,
+        данные которых тоже попадают в ответ.
+        """
+        fields = ['updated_at', 'author_id']
+        if request.user.is_authenticated:
+            fields += ['is_favorited', 'is_in_shopping_cart']
+        try:
+            state = (Recipe.objects
+                     .filter(pk=self.kwargs[self.lookup_field])
+                     .with_user_flags(request.user)
+                     .values_list(*fields)
+                     .first())
+        except (ValueError, TypeError):
+            # Некорректный id: без валидатора, 404 вернёт get_object().
+            state = None
+        if state is None:
+
+            return None
+
+        self.updated_at = state[0]
+
+        return (*state,
+                state[1] in get_subscribed_ids(request),
+                *self.get_related_versions(),
+                request.get_host(),
+                request.accepted_renderer.format)
+
+    def get_related_versions(self):
+        return [get_version(key) for key in (TAGS_VERSION_KEY,
+                                             INGREDIENTS_VERSION_KEY,
+                                             USERS_VERSION_KEY)]
+
+    def get_last_modified(self, request):
+        if (request.user.is_authenticated
+                or getattr(self, 'updated_at', None) is None):
+
+            return None
+
+        return max(self.updated_at,
+                   *(version_timestamp(version)
+                     for version in self.get_related_versions()))
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -94,6 +210,96 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.delete_from(ShoppingCart, request.user, pk)
 
+    @action(['get'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """
+        Лента подписок: рецепты авторов, на которых подписан пользователь,
+        от новых к старым, с курсорной пагинацией (ссылки next/previous).
+        Принимает те же фильтры, что и список.
+        Способ сборки ленты (при чтении или из FeedEntry) зависит
+        от числа подписок, см. recipes.feeds.filter_feed.
+        """
+        queryset = self.filter_queryset(filter_feed(
+            self.get_queryset(),
+            request.user,
+            len(get_subscribed_ids(request))))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(['get'], detail=False)
+    def cookable(self, request):
+        """
+        Рецепты, которые можно приготовить из ингредиентов ingredients,
+        по убыванию покрытия (см. RecipeCoverageIndex), не больше limit.
+        Ранжирование идёт по индексу в памяти, из БД одним запросом
+        берутся только найденные рецепты и ещё одним - их ингредиенты.
+        """
+        serializer = CookableQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ingredients = set(serializer.validated_data['ingredients'])
+        count, ranked = recipe_coverage_index.rank(
+            ingredients, serializer.validated_data['limit'])
+        recipes = Recipe.objects.with_ingredients().in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked])
+        results = []
+        for recipe_id, matched, total in ranked:
+            # Рецепт мог быть удалён после построения индекса.
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.coverage = matched / total
+                results.append(recipe)
+
+        return Response({
+            'count': count,
+            'results': CookableRecipeSerializer(
+                results,
+                many=True,
+                context={'request': request,
+                         'ingredients': ingredients}).data,
+        })
+
+    @action(['get'], detail=False)
+    def popular(self, request):
+        """
+        Рецепты по убыванию рейтинга из таблицы RecipePopularity
+        (её обновляет команда refresh_popularity): страница берётся
+        по индексу рейтинга, без агрегации избранного и корзин.
+        С параметром cursor - курсорная пагинация по рейтингу.
+        """
+        self.cursor_ordering = POPULAR_RECIPES_ORDERING
+        queryset = self.filter_queryset(
+            self.get_queryset()
+            .filter(popularity__isnull=False)
+            .annotate(popularity_score=F('popularity__score'))
+            .order_by(*POPULAR_RECIPES_ORDERING))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(['get'],
+            detail=True,
+            url_path=r'image/(?P<variant>\w+)',
+            permission_classes=(AllowAny,))
+    def image_variant(self, request, pk, variant):
+        """
+        Отдаёт редирект на вариант картинки рецепта,
+        создавая его на месте, если фоновый поток ещё не успел.
+        """
+        recipe = get_object_or_404(Recipe.objects.only('image'), pk=pk)
+        if variant not in VARIANTS or not recipe.image:
+            raise Http404
+
+        image_variants.generate(recipe.image.name, (variant,))
+
+        return HttpResponseRedirect(
+            image_variants.url(recipe.image.name, variant))
+
     def delete_from(self, model, user, pk):
         obj = model.objects.filter(user=user, recipe__pk=pk)
         if obj.exists():
@@ -106,37 +312,42 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(['get'],
             detail=False,
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            content_negotiation_class=IgnoreFormatParamNegotiation)
     def download_shopping_cart(self, request):
+        file_format = request.query_params.get(SHOPPING_CART_FORMAT_PARAM,
+                                               TextShoppingCart.extension)
+        renderer = SHOPPING_CART_FORMATS.get(file_format)
+        if renderer is None:
+            return Response({'errors': (
+                f'Неизвестный формат файла {file_format}. '
+                f'Доступны: {", ".join(SHOPPING_CART_FORMATS)}.')},
+                status=status.HTTP_400_BAD_REQUEST)
+
         if not request.user.shopping_cart.exists():
             return Response({'errors': 'Ваша корзина покупок пуста.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        ingredients = (RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit__name')
-            .annotate(amount=Sum('amount')))
-        current_date = datetime.today().date().strftime(DATE_FORMAT)
-        shopping_cart = [f'Корзина покупок для '
-                         f'{request.user.get_full_name()} '
-                         f'от {current_date}\n']
-        for ingredient in ingredients:
-            shopping_cart.append(
-                f'- {ingredient["ingredient__name"]}: {ingredient["amount"]} '
-                f'{ingredient["ingredient__measurement_unit__name"]}')
-        shopping_cart.append('\nКорзина собрана в FoodGram')
-        shopping_cart = '\n'.join(shopping_cart)
-        file_name = f'{request.user.username}_shopping_cart.txt'
-        response = HttpResponse(shopping_cart, content_type='text/plain')
+
+        file_name = (f'{request.user.username}_shopping_cart'
+                     f'.{renderer.extension}')
+        response = StreamingHttpResponse(
+            render_shopping_cart(request.user, renderer),
+            content_type=renderer.content_type)
         response['Content-Disposition'] = f'attachment; filename={file_name}'
 
         return response
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(VersionedConditionalGetMixin,
+                 VersionedCacheMixin,
+                 viewsets.ModelViewSet):
     """
     Вьюсет для /api/tags/*.
     Доступ для чтения: всем, ред-е и создание: только админу.
+    Готовые ответы кэшируются до изменения тэгов,
+    на условные запросы (ETag/Last-Modified) отвечает 304.
     """
+    cache_version_key = TAGS_VERSION_KEY
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -151,8 +362,12 @@ class CustomUserViewSet(UserViewSet):
     Две дополнительные actions для аутентифицированных:
     subscribe - подписаться/отписаться на(от) автора,
     subscriptions - вывести список подписок и их рецептов.
+    Списки с параметром cursor отдаются курсорной пагинацией по username,
+    иначе count кэшируется до изменения пользователей или подписок.
     """
-    pagination_class = PageLimitPagination
+    pagination_class = CachedCountPagination
+    cursor_ordering = USERS_CURSOR_ORDERING
+    count_version_keys = (USERS_VERSION_KEY, SUBSCRIPTIONS_VERSION_KEY)
     resend_activation = None
     reset_password = None
     reset_password_confirm = None
@@ -165,6 +380,13 @@ class CustomUserViewSet(UserViewSet):
 
         return super().me(request, *args, **kwargs)
 
+    def get_recipes_limit(self, request):
+        """Проверенный recipes_limit из запроса или None."""
+        serializer = RecipesLimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        return serializer.validated_data.get('recipes_limit')
+
     @action(['post', 'delete'],
             detail=True,
             permission_classes=(IsAuthenticated,))
@@ -175,9 +397,11 @@ class CustomUserViewSet(UserViewSet):
             serializer = SubscriptionSerializer(
                 data={'user': request.user.pk,
                       'subscribing': subscribing.pk},
-                context={'request': request})
+                context={'request': request,
+                         'recipes_limit': self.get_recipes_limit(request)})
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            reset_subscribed_ids(request)
 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -195,11 +419,42 @@ class CustomUserViewSet(UserViewSet):
             detail=False,
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        queryset = User.objects.filter(
-            subscribing__user=request.user).prefetch_related('recipes')
+        """
+        Список подписок фиксированным числом запросов:
+        recipes_count - поддерживаемый сигналами счётчик автора,
+        а первые recipes_limit рецептов каждого автора подгружаются
+        одним prefetch-запросом с ROW_NUMBER()
+        (Django делает так для среза в Prefetch).
+        """
+        recipes_limit = self.get_recipes_limit(request)
+        recipes = Recipe.objects.all()
+        if recipes_limit:
+            recipes = recipes[:recipes_limit]
+        queryset = (User.objects
+                    .filter(subscribing__user=request.user)
+                    .order_by(*User._meta.ordering)
+                    .prefetch_related(Prefetch('recipes',
+                                               queryset=recipes,
+                                               to_attr='limited_recipes')))
         pages = self.paginate_queryset(queryset)
-        serializer = SubscriptionSerializer(pages,
-                                            many=True,
-                                            context={'request': request})
+        serializer = SubscriptionListSerializer(
+            pages,
+            many=True,
+            context={'request': request, 'recipes_limit': recipes_limit})
 
         return self.get_paginated_response(serializer.data)
+
+
+class MetricsView(APIView):
+    """
+    /api/metrics - метрики бэкенда в формате Prometheus
+    (запросы и их время по вьюсетам/actions, SQL-запросы,
+    попадания в кэши, воркеры gunicorn).
+    Доступ: админам и запросам с локального адреса.
+    """
+    permission_classes = (IsStaffOrLocalhost,)
+
+    def get(self, request):
+        content, content_type = export_metrics()
+
+        return HttpResponse(content, content_type=content_type)
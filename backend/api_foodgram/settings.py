@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +80,85 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+    # Версии данных должны быть общими для всех воркеров gunicorn,
+    # поэтому по умолчанию хранятся в файлах, а не в памяти процесса.
+    # Версий по одной на корзину пользователя, а вытеснение при
+    # MAX_ENTRIES удаляет случайные ключи, в том числе общие
+    # (auth, ingredients), поэтому предел задан с большим запасом.
+    'versions': {
+        'BACKEND': os.getenv(
+            'VERSIONS_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'VERSIONS_CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache', 'versions')),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('VERSIONS_CACHE_MAX_ENTRIES',
+                                         default=10 ** 9)),
+        },
+    },
+}
+
+VERSIONS_CACHE_ALIAS = 'versions'
+
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', default='default')
+
+INGREDIENT_SEARCH_INDEX = os.getenv('INGREDIENT_SEARCH_INDEX',
+                                    default='True') == 'True'
+
+SHOPPING_CART_PDF_FONT = os.getenv('SHOPPING_CART_PDF_FONT',
+                                   default='DejaVuSans.ttf')
+
+# Создавать варианты картинок рецептов в фоновом потоке (False - сразу).
+IMAGE_VARIANTS_WORKER = os.getenv('IMAGE_VARIANTS_WORKER',
+                                  default='True') == 'True'
+
+# Заголовки с метриками запроса (Server-Timing, X-Query-Count).
+QUERY_METRICS_HEADERS = os.getenv('QUERY_METRICS_HEADERS',
+                                  default='True') == 'True'
+
+# Бюджеты обработчиков API: превышение пишется в лог предупреждением,
+# при QUERY_BUDGETS_STRICT (для тестов) - падает QueryBudgetError.
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': {'queries': 8, 'sql_ms': 200},
+    'RecipeViewSet.cookable': {'queries': 4, 'sql_ms': 50},
+    'RecipeViewSet.feed': {'queries': 8, 'sql_ms': 200},
+    'RecipeViewSet.popular': {'queries': 8, 'sql_ms': 200},
+    'RecipeViewSet.retrieve': {'queries': 8, 'sql_ms': 100},
+    'RecipeViewSet.create': {'queries': 30, 'sql_ms': 300},
+    'RecipeViewSet.partial_update': {'queries': 30, 'sql_ms': 300},
+    'RecipeViewSet.favorite': {'queries': 8},
+    'RecipeViewSet.shopping_cart': {'queries': 8},
+    'RecipeViewSet.download_shopping_cart': {'queries': 5},
+    'CustomUserViewSet.list': {'queries': 5},
+    'CustomUserViewSet.subscriptions': {'queries': 8},
+    'IngredientViewSet.list': {'queries': 3},
+    'TagViewSet.list': {'queries': 3},
+}
+
+QUERY_BUDGETS_STRICT = os.getenv('QUERY_BUDGETS_STRICT',
+                                 default='False') == 'True'
+
+# Выше этого числа строк (по оценке планировщика PostgreSQL) count
+# в списках отдаётся оценкой, а не точным COUNT(*). 0 - всегда точно.
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(os.getenv(
+    'PAGINATION_COUNT_ESTIMATE_THRESHOLD', default=100000))
+
+# Лента подписок пользователя, подписанного больше чем на столько авторов,
+# хранится готовой (FeedEntry), иначе собирается запросом при чтении.
+# После изменения порога нужно выполнить rebuild_feeds.
+FEED_MATERIALIZE_THRESHOLD = int(os.getenv('FEED_MATERIALIZE_THRESHOLD',
+                                           default=100))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,7 +180,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 REST_FRAMEWORK = {
     'PAGE_SIZE': 6,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -158,5 +238,10 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'core.metrics': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
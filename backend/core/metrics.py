@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .prometheus import observe_request
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetError(Exception):
+    """Запрос к API превысил бюджет из QUERY_BUDGETS."""
+
+
+def get_view_name(request, view_func):
+    """
+    Имя обработчика запроса для метрик и бюджетов:
+    <вьюсет>.<action> для DRF (например, RecipeViewSet.list),
+    иначе - имя маршрута или функции.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+
+        return (request.resolver_match.view_name if request.resolver_match
+                else view_func.__name__)
+
+    method = request.method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса: кол-во SQL-запросов и их суммарное время,
+    время рендера (сериализации в байты) ответа, общее время и размер ответа.
+    Время - в миллисекундах.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        self.total_time = None
+        self.size = None
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper, считающая запросы."""
+        started = time.perf_counter()
+        try:
+
+            return execute(sql, params, many, context)
+
+        finally:
+            self.queries += 1
+            self.sql_time += (time.perf_counter() - started) * 1000
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def finish_render(self, response):
+        self.render_time = (time.perf_counter() - self.render_started) * 1000
+
+    def finish(self, response):
+        self.total_time = (time.perf_counter() - self.started) * 1000
+        if not response.streaming:
+            self.size = len(response.content)
+
+    def as_dict(self):
+        return {'view': self.view,
+                'queries': self.queries,
+                'sql_ms': round(self.sql_time, 2),
+                'render_ms': round(self.render_time, 2),
+                'total_ms': round(self.total_time, 2),
+                'size': self.size}
+
+
+class QueryMetricsMiddleware:
+    """
+    Считает для каждого запроса кол-во SQL-запросов, время в БД,
+    время рендера ответа и его размер.
+    Отдаёт их заголовками Server-Timing, X-Query-Count и X-Response-Size
+    (если включено QUERY_METRICS_HEADERS), пишет JSON-строкой
+    в лог core.metrics и в метрики Prometheus (см. core.prometheus).
+    Для обработчиков из QUERY_BUDGETS ({'RecipeViewSet.list':
+    {'queries': 10, 'sql_ms': 100}}) превышение бюджета пишется
+    предупреждением, а при QUERY_BUDGETS_STRICT - падает исключением
+    QueryBudgetError (для тестов).
+    Запросы, выполненные при отдаче потокового ответа, не учитываются.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.execute))
+            response = self.get_response(request)
+        metrics.finish(response)
+
+        if settings.QUERY_METRICS_HEADERS:
+            self.add_headers(response, metrics)
+        logger.info(json.dumps(metrics.as_dict()))
+        observe_request(request, response, metrics)
+        self.check_budget(metrics)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.view = get_view_name(request, view_func)
+
+    def process_template_response(self, request, response):
+        request.metrics.start_render()
+        response.add_post_render_callback(request.metrics.finish_render)
+
+        return response
+
+    def add_headers(self, response, metrics):
+        response['Server-Timing'] = (
+            f'db;dur={metrics.sql_time:.2f}, '
+            f'render;dur={metrics.render_time:.2f}, '
+            f'total;dur={metrics.total_time:.2f}')
+        response['X-Query-Count'] = metrics.queries
+        if metrics.size is not None:
+            response['X-Response-Size'] = metrics.size
+
+    def check_budget(self, metrics):
+        budget = settings.QUERY_BUDGETS.get(metrics.view)
+        if not budget:
+
+            return
+
+        exceeded = [f'{name}={value:g} > {budget[name]}'
+                    for name, value in (('queries', metrics.queries),
+                                        ('sql_ms', metrics.sql_time))
+                    if name in budget and value > budget[name]]
+        if not exceeded:
+
+            return
+
+        message = f'{metrics.view} превысил бюджет: {", ".join(exceeded)}'
+        if settings.QUERY_BUDGETS_STRICT:
+            raise QueryBudgetError(message)
+
+        logger.warning(message)
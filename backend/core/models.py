@@ -19,3 +19,31 @@ class NameOrderingStr(models.Model):
     def __str__(self):
 
         return self.name[:TEXT_LENGTH]
+
+
+class CountersModel(models.Model):
+    """
+    Абстрактная модель со счётчиками counter_fields, которые меняются
+    только UPDATE с F() (см. recipes.counters).
+    save() без update_fields не пишет счётчики, иначе устаревшие
+    значения из памяти затирали бы значения в БД.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if (update_fields is None and not force_insert
+                and not self._state.adding):
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [field.attname
+                             for field in self._meta.concrete_fields
+                             if not field.primary_key
+                             and field.name not in self.counter_fields
+                             and field.attname not in deferred_fields]
+        super().save(force_insert=force_insert,
+                     force_update=force_update,
+                     using=using,
+                     update_fields=update_fields)
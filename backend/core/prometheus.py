@@ -0,0 +1,69 @@
+import os
+import resource
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+from .constants import QUERY_COUNT_BUCKETS
+
+REQUESTS = Counter('foodgram_requests_total',
+                   'Запросы к бэкенду.',
+                   ('view', 'method', 'status'))
+LATENCY = Histogram('foodgram_request_duration_seconds',
+                    'Время обработки запроса.',
+                    ('view',))
+QUERIES = Histogram('foodgram_request_db_queries',
+                    'Кол-во SQL-запросов за запрос.',
+                    ('view',),
+                    buckets=QUERY_COUNT_BUCKETS)
+SQL_TIME = Histogram('foodgram_request_db_duration_seconds',
+                     'Суммарное время SQL-запросов за запрос.',
+                     ('view',))
+CACHE = Counter('foodgram_cache_requests_total',
+                'Обращения к кэшам приложения.',
+                ('cache', 'result'))
+WORKERS = Gauge('foodgram_workers',
+                'Живые процессы (воркеры gunicorn).',
+                multiprocess_mode='livesum')
+WORKER_REQUESTS = Gauge('foodgram_worker_requests',
+                        'Запросы, обработанные воркером.',
+                        multiprocess_mode='liveall')
+WORKER_MAX_RSS = Gauge('foodgram_worker_max_rss_bytes',
+                       'Пиковый объём памяти воркера.',
+                       multiprocess_mode='liveall')
+
+WORKERS.set(1)
+
+
+def observe_request(request, response, metrics):
+    """Записывает метрики запроса (см. core.metrics.RequestMetrics)."""
+    view = metrics.view or 'unknown'
+    REQUESTS.labels(view, request.method, response.status_code).inc()
+    LATENCY.labels(view).observe(metrics.total_time / 1000)
+    QUERIES.labels(view).observe(metrics.queries)
+    SQL_TIME.labels(view).observe(metrics.sql_time / 1000)
+    WORKER_REQUESTS.inc()
+    # ru_maxrss в Linux - в килобайтах.
+    WORKER_MAX_RSS.set(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def record_cache(cache, hit):
+    """Учитывает попадание (hit=True) или промах в кэш cache."""
+    CACHE.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def export_metrics():
+    """
+    Возвращает (тело, content-type) метрик в текстовом формате Prometheus.
+    Если задан PROMETHEUS_MULTIPROC_DIR, метрики собираются из файлов
+    всех воркеров, иначе - только текущего процесса.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+def replace_file(storage, name, chunks):
+    """
+    Записывает файл name в файловое хранилище storage с перезаписью.
+    Данные пишутся во временный файл рядом и атомарно переименовываются,
+    поэтому читатели не видят недописанный файл, а одновременная
+    запись того же файла не создаёт копию с суффиксом.
+    """
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'xb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        if storage.file_permissions_mode is not None:
+            os.chmod(temp_path, storage.file_permissions_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла - sha256 его содержимого:
+    <каталог upload_to>/<первые 2 символа хэша>/<хэш>.<расширение>.
+    Одинаковое содержимое хранится одним файлом: повторное сохранение
+    (например, та же картинка при каждом PATCH) не пишет содержимое
+    и возвращает имя уже сохранённого файла.
+    Оно только обновляет время изменения файла, поэтому
+    collect_images, удаляющая файлы без ссылок старше
+    IMAGE_GC_GRACE_PERIOD, не удалит его, пока новый рецепт
+    с этой картинкой ещё не сохранён.
+    """
+    def get_content_name(self, name, content):
+        """
+        Имя, под которым будет сохранено содержимое content
+        (name - имя с каталогом upload_to, от него берётся расширение).
+        """
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        hexdigest = digest.hexdigest()
+
+        return posixpath.join(
+            posixpath.dirname(name),
+            hexdigest[:2],
+            hexdigest + posixpath.splitext(name)[1].lower())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, content)
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+
+            return super().save(name, content, max_length)
+
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Одно имя - одно содержимое, поэтому суффиксы не нужны.
+
+        return name
+
+    def _save(self, name, content):
+
+        return replace_file(self, name, content.chunks())
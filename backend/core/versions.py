@@ -0,0 +1,59 @@
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def get_versions_cache():
+    """Кэш, в котором хранятся версии (см. VERSIONS_CACHE_ALIAS)."""
+    return caches[settings.VERSIONS_CACHE_ALIAS]
+
+
+def new_version():
+    """
+    Новая версия: время создания в микросекундах и случайный хвост.
+    По времени можно узнать момент последнего изменения данных
+    (см. version_timestamp), хвост исключает совпадения.
+    """
+    return f'{time.time_ns() // 1000:x}-{uuid.uuid4().hex[:8]}'
+
+
+def version_timestamp(version):
+    """Возвращает момент создания версии (aware datetime в UTC)."""
+    microseconds = int(version.split('-', 1)[0], 16)
+
+    return datetime.fromtimestamp(microseconds / 10 ** 6, tz=timezone.utc)
+
+
+def get_version(key):
+    """
+    Возвращает текущую версию данных по ключу key.
+    Версия - строка, меняющаяся при каждом изменении данных.
+    Если версии ещё нет (или кэш был очищен), создаётся новая,
+    поэтому старые закэшированные значения не могут совпасть с ней.
+    """
+    cache = get_versions_cache()
+    version = cache.get(key)
+    if version is not None:
+
+        return version
+
+    version = new_version()
+    if cache.add(key, version, timeout=None):
+
+        return version
+
+    return cache.get(key, version)
+
+
+def bump_version(key):
+    """
+    Меняет версию данных по ключу key после коммита текущей транзакции,
+    чтобы никто не успел закэшировать ещё незакоммиченное состояние
+    под новой версией.
+    """
+    transaction.on_commit(
+        lambda: get_versions_cache().set(key, new_version(), timeout=None))
@@ -1,5 +1,23 @@
+import os
+import shutil
+
 bind = "0:8000"
 accesslog = "../var/log/gunicorn.access.log"
 errorlog = "../var/log/gunicorn.error.log"
 capture_output = True
 loglevel = "info"
+
+# Метрики Prometheus собираются со всех воркеров через файлы в этом каталоге.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def on_starting(server):
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
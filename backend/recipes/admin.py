@@ -1,7 +1,9 @@
 from django.contrib import admin
 
 from .models import (Favorite, Ingredient, MeasureUnit, Recipe,
-                     RecipeIngredient, RecipeTag, ShoppingCart, Tag)
+                     RecipeIngredient, RecipePopularity, RecipeTag,
+                     ShoppingCart, Tag)
+from .versions import bump_recipe_ingredients
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -22,26 +24,52 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(MeasureUnit)
 class MeasureUnitAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'base_unit', 'factor',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'in_favorites',)
-    readonly_fields = ('in_favorites',)
+    readonly_fields = ('in_favorites', 'in_carts_count',)
     list_filter = ('author', 'name', 'tags',)
     inlines = [RecipeIngredientInline, RecipeTagInline]
 
     @admin.display(description='Количество добавлений в избранное')
     def in_favorites(self, obj):
 
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        bump_recipe_ingredients(form.instance.pk)
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_recipe_ingredients(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_recipe_ingredients(obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for recipe_id in recipe_ids:
+            bump_recipe_ingredients(recipe_id)
+
+
+@admin.register(RecipePopularity)
+class RecipePopularityAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'score', 'favorites_count', 'in_carts_count',
+                    'refreshed_at',)
+    readonly_fields = ('recipe', 'score', 'favorites_count',
+                       'in_carts_count', 'refreshed_at',)
+
 
 @admin.register(RecipeTag)
 class RecipeTagAdmin(admin.ModelAdmin):
@@ -55,9 +83,9 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe',)
+    list_display = ('user', 'recipe', 'created_at',)
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
+    list_display = ('user', 'recipe', 'created_at',)
@@ -1,3 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
 STANDART_MAX_LENGTH = 200
 HEX_COLOR_REGEX = '^#([0-9a-f]{6}|[0-9a-f]{3})$'
 TEXT_LENGTH = 20
+IMPORT_BATCH_SIZE = 1000
+IMPORT_READ_CHUNK_SIZE = 64 * 1024
+IMPORT_MAX_RECORD_SIZE = 1024 * 1024
+INGREDIENTS_VERSION_KEY = 'version:ingredients'
+FUZZY_SEARCH_LIMIT = 20
+FUZZY_SEARCH_THRESHOLD = 0.3
+SHOPPING_CART_VERSION_KEY = 'version:shopping_cart:{user_id}'
+UNIT_FACTOR_MAX_DIGITS = 12
+UNIT_FACTOR_DECIMAL_PLACES = 4
+UNIT_FACTOR_MIN_VALUE = Decimal('0.0001')
+UNIT_AMOUNT_DECIMAL_PLACES = 2
+# Единицы, в которых показывается количество в списке покупок:
+# базовая единица -> (единица, от, до (в базовых единицах, None - без
+# предела), шаг значения). Ложки - только для малых количеств,
+# капли не показываются.
+UNIT_DISPLAY_RULES = {
+    'г': (('кг', Decimal(1000), None, Decimal('0.01')),),
+    'мл': (('л', Decimal(1000), None, Decimal('0.01')),
+           ('ст. л.', Decimal(15), Decimal(60), Decimal('0.5')),
+           ('ч. л.', Decimal(5), Decimal(30), Decimal('0.5'))),
+}
+TAGS_VERSION_KEY = 'version:tags'
+RECIPES_VERSION_KEY = 'version:recipes'
+IMAGE_VARIANTS_DIR = 'recipes/variants'
+IMAGE_VARIANT_WIDTHS = {'small': 320, 'medium': 640}
+IMAGE_VARIANT_FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANTS_VERSION_KEY = 'version:image_variants'
+IMAGES_DIR = 'recipes/images'
+IMAGE_GC_GRACE_PERIOD = 60 * 60
+POPULARITY_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+POPULARITY_HALF_LIFE = timedelta(days=7)
+POPULARITY_FAVORITE_WEIGHT = 1.0
+POPULARITY_CART_WEIGHT = 2.0
+POPULARITY_REFRESH_CHUNK_SIZE = 1000
+FEED_BATCH_SIZE = 1000
+RECIPE_INGREDIENTS_VERSION_KEY = 'version:recipe_ingredients'
+COVERAGE_INDEX_CHUNK_SIZE = 10000
@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Subscription
+
+Counter = namedtuple('Counter', ('source', 'foreign_key', 'target', 'field'))
+
+COUNTERS = (
+    Counter(Favorite, 'recipe', Recipe, 'favorites_count'),
+    Counter(ShoppingCart, 'recipe', Recipe, 'in_carts_count'),
+    Counter(Subscription, 'subscribing', CustomUser, 'followers_count'),
+    Counter(Subscription, 'user', CustomUser, 'subscriptions_count'),
+    Counter(Recipe, 'author', CustomUser, 'recipes_count'),
+)
+
+
+def change_counters(source, instance, delta):
+    """
+    Меняет на delta счётчики, которые считают строки модели source
+    (одним UPDATE с F(), без чтения и без гонок между воркерами).
+    Счётчик не опускается ниже нуля.
+    """
+    for counter in COUNTERS:
+        if counter.source is not source:
+            continue
+
+        value = F(counter.field) + delta
+        if delta < 0:
+            value = Greatest(value, Value(0))
+        counter.target.objects.filter(
+            pk=getattr(instance, f'{counter.foreign_key}_id')
+        ).update(**{counter.field: value})
+
+
+def actual_count(counter):
+    """Выражение с реальным значением счётчика (подзапрос COUNT)."""
+    return Coalesce(
+        Subquery(counter.source.objects
+                 .filter(**{counter.foreign_key: OuterRef('pk')})
+                 .order_by()
+                 .values(counter.foreign_key)
+                 .annotate(count=Count('pk'))
+                 .values('count')),
+        0)
+
+
+def wrong_counters(counter):
+    """Объекты, у которых счётчик расходится с реальным значением."""
+    return (counter.target.objects
+            .annotate(actual=actual_count(counter))
+            .exclude(**{counter.field: F('actual')}))
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .constants import FEED_BATCH_SIZE
+from .models import FeedEntry, Recipe
+from users.models import CustomUser, Subscription
+
+
+def is_materialized(subscriptions_count):
+    """
+    Хранится ли готовой лента пользователя с таким числом подписок
+    (см. FEED_MATERIALIZE_THRESHOLD).
+    """
+    return subscriptions_count > settings.FEED_MATERIALIZE_THRESHOLD
+
+
+def get_subscriptions_count(user_id):
+    """Число подписок пользователя по счётчику (см. recipes.counters)."""
+    return (CustomUser.objects.filter(pk=user_id)
+            .values_list('subscriptions_count', flat=True)
+            .first()) or 0
+
+
+def add_to_feed(user_id, recipes):
+    """Добавляет рецепты recipes (queryset) в ленту пользователя."""
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+         for pk, pub_date in recipes.values_list('pk', 'pub_date')),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def materialize_feed(user_id):
+    """Строит ленту пользователя заново по всем его подпискам."""
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        add_to_feed(user_id, Recipe.objects.filter(
+            author__in=Subscription.objects.filter(user_id=user_id)
+            .values('subscribing')))
+
+
+def follow(subscription):
+    """
+    Обновляет ленту после новой подписки:
+    добавляет рецепты автора, если лента уже хранится,
+    или строит её целиком, если подписок стало больше порога.
+    """
+    subscriptions_count = get_subscriptions_count(subscription.user_id)
+    if not is_materialized(subscriptions_count):
+
+        return
+
+    if not is_materialized(subscriptions_count - 1):
+        materialize_feed(subscription.user_id)
+
+        return
+
+    add_to_feed(subscription.user_id,
+                Recipe.objects.filter(author_id=subscription.subscribing_id))
+
+
+def unfollow(subscription):
+    """
+    Обновляет ленту после отписки: убирает рецепты автора
+    или всю ленту, если подписок стало не больше порога.
+    """
+    entries = FeedEntry.objects.filter(user_id=subscription.user_id)
+    if is_materialized(get_subscriptions_count(subscription.user_id)):
+        entries = entries.filter(
+            recipe__author_id=subscription.subscribing_id)
+    entries.delete()
+
+
+def publish(recipe):
+    """Добавляет новый рецепт в хранящиеся ленты подписчиков автора."""
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+         for user_id in (Subscription.objects
+                         .filter(subscribing_id=recipe.author_id,
+                                 user__subscriptions_count__gt=(
+                                     settings.FEED_MATERIALIZE_THRESHOLD))
+                         .values_list('user_id', flat=True))),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def filter_feed(queryset, user, subscriptions_count):
+    """
+    Оставляет в queryset рецептов ленту подписок пользователя
+    с аннотацией feed_pub_date для сортировки.
+    Обычная лента собирается при чтении: подзапрос подписок
+    и индекс рецептов (author, -pub_date, -id).
+    Лента пользователя с подписками больше порога читается
+    из таблицы FeedEntry по индексу (user, -pub_date, -recipe).
+    """
+    if is_materialized(subscriptions_count):
+
+        return (queryset.filter(feed_entries__user=user)
+                .annotate(feed_pub_date=F('feed_entries__pub_date')))
+
+    return (queryset.filter(author__in=Subscription.objects
+                            .filter(user=user).values('subscribing'))
+            .annotate(feed_pub_date=F('pub_date')))
@@ -0,0 +1,169 @@
+import io
+import logging
+import posixpath
+import queue
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .constants import (IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY,
+                        IMAGE_VARIANT_WIDTHS, IMAGE_VARIANTS_DIR,
+                        IMAGE_VARIANTS_VERSION_KEY)
+from .models import Recipe
+from core.storage import replace_file
+from core.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {f'{name}_{image_format}': (width, image_format)
+            for name, width in IMAGE_VARIANT_WIDTHS.items()
+            for image_format in IMAGE_VARIANT_FORMATS}
+
+
+def variant_path(image_name, variant):
+    """
+    Путь варианта картинки в хранилище.
+    Зависит только от имени оригинала, поэтому URL варианта
+    можно построить без обращения к БД и хранилищу.
+    """
+    _, image_format = VARIANTS[variant]
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+
+    return posixpath.join(
+        IMAGE_VARIANTS_DIR,
+        f'{stem}_{variant}.{IMAGE_VARIANT_FORMATS[image_format]}')
+
+
+def image_storage():
+    """Хранилище оригиналов картинок рецептов."""
+    return Recipe._meta.get_field('image').storage
+
+
+def render_variant(image, width, image_format):
+    """Уменьшает картинку до ширины width и кодирует в image_format."""
+    variant = image.copy()
+    # thumbnail сохраняет пропорции и не увеличивает маленькие картинки.
+    variant.thumbnail((width, variant.height))
+    if image_format == 'jpeg' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    output = io.BytesIO()
+    variant.save(output,
+                 format=image_format,
+                 quality=IMAGE_VARIANT_QUALITY,
+                 optimize=True)
+
+    return output.getvalue()
+
+
+class ImageVariants:
+    """
+    Варианты картинок рецептов: уменьшенные копии фиксированной ширины
+    в JPEG и WebP (см. IMAGE_VARIANT_WIDTHS и IMAGE_VARIANT_FORMATS).
+    Создаются фоновым потоком из локальной очереди после сохранения
+    рецепта; если вариант запросили раньше, он создаётся на месте
+    (см. generate). Уже созданные варианты запоминаются в памяти
+    процесса, чтобы не проверять хранилище на каждый запрос;
+    запомненное сбрасывается, когда меняется версия
+    IMAGE_VARIANTS_VERSION_KEY (её меняет collect_images после удаления
+    файлов в любом процессе).
+    Варианты пишутся с перезаписью (см. core.storage.replace_file),
+    поэтому одновременные generate не создают копий с суффиксами.
+    Хранилище по умолчанию должно быть файловым.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.known = set()
+        self.version = None
+        self.worker = None
+
+    def refresh(self):
+        """Забывает созданные варианты, если их могли удалить."""
+        version = get_version(IMAGE_VARIANTS_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.known = set()
+                    self.version = version
+
+    def exists(self, path):
+        self.refresh()
+        if path in self.known:
+
+            return True
+
+        if default_storage.exists(path):
+            self.known.add(path)
+
+            return True
+
+        return False
+
+    def generate(self, image_name, variants=VARIANTS):
+        """Создаёт недостающие варианты картинки image_name."""
+        missing = [variant for variant in variants
+                   if not self.exists(variant_path(image_name, variant))]
+        if not missing:
+
+            return
+
+        with image_storage().open(image_name) as file:
+            image = Image.open(file)
+            image.load()
+            for variant in missing:
+                path = variant_path(image_name, variant)
+                replace_file(default_storage, path,
+                             (render_variant(image, *VARIANTS[variant]),))
+                self.known.add(path)
+
+    def enqueue(self, image_name):
+        """Ставит создание вариантов картинки в очередь фонового потока."""
+        if not settings.IMAGE_VARIANTS_WORKER:
+            self.generate(image_name)
+
+            return
+
+        with self.lock:
+            if image_name in self.pending:
+
+                return
+
+            self.pending.add(image_name)
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.work,
+                                               name='image-variants',
+                                               daemon=True)
+                self.worker.start()
+        self.queue.put(image_name)
+
+    def work(self):
+        while True:
+            image_name = self.queue.get()
+            try:
+                self.generate(image_name)
+            except Exception:
+                logger.exception('Не удалось создать варианты %s',
+                                 image_name)
+            finally:
+                with self.lock:
+                    self.pending.discard(image_name)
+
+    def url(self, image_name, variant):
+        """
+        URL варианта, если он уже создан, иначе None
+        (создание при этом ставится в очередь).
+        """
+        path = variant_path(image_name, variant)
+        if self.exists(path):
+
+            return default_storage.url(path)
+
+        self.enqueue(image_name)
+
+        return None
+
+
+image_variants = ImageVariants()
@@ -0,0 +1,72 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from core.versions import bump_version
+from recipes.constants import (IMAGE_GC_GRACE_PERIOD, IMAGE_VARIANTS_DIR,
+                               IMAGE_VARIANTS_VERSION_KEY, IMAGES_DIR)
+from recipes.images import VARIANTS, image_storage, variant_path
+from recipes.models import Recipe
+
+
+def walk(storage, path):
+    """Рекурсивно перечисляет пути файлов в каталоге хранилища."""
+    if not storage.exists(path):
+
+        return
+
+    directories, files = storage.listdir(path)
+    for file in files:
+        yield posixpath.join(path, file)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    """
+    Сборщик мусора картинок рецептов.
+    Удаляет оригиналы, на которые не ссылается ни один рецепт,
+    и варианты картинок без оригинала.
+    Файлы моложе IMAGE_GC_GRACE_PERIOD не трогаются:
+    их рецепт может быть ещё не сохранён (повторно загруженная
+    картинка тоже считается свежей, см. ContentAddressedStorage).
+    Картинки удалённых рецептов и заменённые картинки удаляет
+    только эта команда, её нужно запускать по расписанию.
+    После удаления меняется версия IMAGE_VARIANTS_VERSION_KEY,
+    чтобы воркеры забыли удалённые варианты.
+    """
+    help = 'Удаляет картинки рецептов, на которые никто не ссылается.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--dry-run',
+                            action='store_true',
+                            help='Только показать, что будет удалено.')
+
+    def handle(self, *args, **options):
+        referenced = set(Recipe.objects.values_list('image', flat=True))
+        referenced_variants = {variant_path(image_name, variant)
+                               for image_name in referenced
+                               for variant in VARIANTS}
+        deadline = timezone.now() - timedelta(seconds=IMAGE_GC_GRACE_PERIOD)
+
+        deleted = 0
+        for storage, directory, keep in (
+                (image_storage(), IMAGES_DIR, referenced),
+                (default_storage, IMAGE_VARIANTS_DIR, referenced_variants)):
+            for path in walk(storage, directory):
+                if (path in keep
+                        or storage.get_modified_time(path) > deadline):
+                    continue
+
+                self.stdout.write(f'Удаляется {path}')
+                if not options['dry_run']:
+                    storage.delete(path)
+                deleted += 1
+        if deleted and not options['dry_run']:
+            bump_version(IMAGE_VARIANTS_VERSION_KEY)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {deleted}'))
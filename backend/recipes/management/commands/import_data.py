@@ -1,51 +1,300 @@
+import csv
 import json
 import pathlib
+import time
+from contextlib import nullcontext
+from itertools import islice
 
-from django.core.management.base import BaseCommand, CommandParser
-from django.db import IntegrityError
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+from django.db import transaction
 
+from core.versions import bump_version
+from recipes.constants import (IMPORT_BATCH_SIZE, IMPORT_MAX_RECORD_SIZE,
+                               IMPORT_READ_CHUNK_SIZE, INGREDIENTS_VERSION_KEY,
+                               STANDART_MAX_LENGTH)
 from recipes.models import Ingredient, MeasureUnit
 
+JSON_WHITESPACE = ' \t\r\n'
+JSON_VALUE_START = '{["-0123456789tfn'
+# Ошибка разбора дальше этого числа символов от конца буфера не может
+# объясняться тем, что кусок файла оборвал литерал или число.
+JSON_TOKEN_MARGIN = 16
+
+
+class JsonArrayReader:
+    """
+    Потоковый читатель json-массива: при итерации отдаёт элементы по одному.
+    В памяти держится только текущий кусок файла,
+    а не весь массив целиком.
+    Между элементами обязательна запятая. Некорректный элемент
+    отклоняется сразу, не дочитывая файл (кроме незакрытой строки:
+    она дочитывается не дальше IMPORT_MAX_RECORD_SIZE символов).
+    Ошибки - CommandError с номером символа в файле.
+    """
+    def __init__(self, file, chunk_size=IMPORT_READ_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        # Сколько символов файла отброшено до начала буфера.
+        self.offset = 0
+        self.eof = False
+
+    def refill(self):
+        """Отбрасывает разобранную часть буфера и дочитывает кусок файла."""
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        self.offset += self.position
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def fail(self, message, position=None):
+        """Выбрасывает CommandError с номером символа в файле."""
+        if position is None:
+            position = self.position
+        raise CommandError(f'Некорректный json в файле: {message} '
+                           f'(символ {self.offset + position}).')
+
+    def next_char(self, skip):
+        """Пропускает символы из skip и возвращает следующий символ."""
+        while True:
+            while (self.position < len(self.buffer)
+                   and self.buffer[self.position] in skip):
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+
+                return self.buffer[self.position:self.position + 1]
+
+            self.refill()
+
+    def is_incomplete(self, error):
+        """
+        Может ли ошибка разбора объясняться тем, что элемент
+        ещё не дочитан из файла.
+        """
+        if self.eof or (len(self.buffer) - self.position
+                        > IMPORT_MAX_RECORD_SIZE):
+
+            return False
+
+        return (error.msg.startswith('Unterminated string')
+                or error.pos >= len(self.buffer) - JSON_TOKEN_MARGIN)
+
+    def decode(self):
+        """Разбирает очередной элемент массива, дочитывая файл."""
+        char = self.next_char(JSON_WHITESPACE)
+        if not char:
+            raise CommandError('Файл оборвался до конца json-массива.')
+        if char not in JSON_VALUE_START:
+            self.fail('ожидался элемент массива')
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                if not self.is_incomplete(error):
+                    self.fail(error.msg, error.pos)
+                self.refill()
+                continue
+
+            # Значение, закончившееся ровно на границе куска,
+            # могло быть обрезано (например, число): дочитываем и разбираем
+            # снова.
+            if end == len(self.buffer) and not self.eof:
+                self.refill()
+                continue
+
+            self.position = end
+
+            return obj
+
+    def __iter__(self):
+        if self.next_char(JSON_WHITESPACE) != '[':
+            raise CommandError('Файл должен содержать json-массив.')
+        self.position += 1
+        if self.next_char(JSON_WHITESPACE) == ']':
+
+            return
+
+        while True:
+            yield self.decode()
+
+            char = self.next_char(JSON_WHITESPACE)
+            if char == ']':
+
+                return
+
+            if not char:
+                raise CommandError('Файл оборвался до конца json-массива.')
+            if char != ',':
+                self.fail('ожидалась запятая или конец массива')
+            self.position += 1
+
+
+def read_csv(file):
+    """Потоково читает csv вида 'название,единица измерения' без шапки."""
+    for row in csv.reader(file):
+        if not row:
+            continue
+        yield {'name': row[0],
+               'measurement_unit': row[1] if len(row) > 1 else None}
+
+
+READERS = {
+    '.json': JsonArrayReader,
+    '.csv': read_csv,
+}
+
+
+def clean_row(row):
+    """
+    Проверяет запись и возвращает пару (название, единица измерения).
+    При некорректной записи выбрасывает ValueError.
+    """
+    if not isinstance(row, dict):
+        raise ValueError(f'запись не является объектом: {row!r}')
+
+    name = row.get('name')
+    unit = row.get('measurement_unit')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f'нет поля name: {row!r}')
+    if not isinstance(unit, str) or not unit.strip():
+        raise ValueError(f'нет поля measurement_unit: {row!r}')
+
+    name, unit = name.strip(), unit.strip()
+    if len(name) > STANDART_MAX_LENGTH or len(unit) > STANDART_MAX_LENGTH:
+        raise ValueError(f'слишком длинное значение: {row!r}')
+
+    return name, unit
+
+
+def batched(iterable, size):
+    """Разбивает итерируемый объект на списки длиной size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class Command(BaseCommand):
     """
-    Импортирует данные из json-объекта в модель Ingredient,
+    Импортирует данные из json-массива или csv в модель Ingredient,
     а также создаёт объекты в MeasureUnit и связывает их.
-    При обнаружении дубликата/некорректной записи(нет необходимых полей),
-    игнорирует конкретную запись и продолжает импорт дальше, печатая ошибку.
+    Файл читается потоково и пишется в БД пачками через
+    bulk_create(ignore_conflicts=True), поэтому расход памяти
+    не зависит от размера файла.
+    Единицы измерения разрешаются одним запросом на пачку
+    и запоминаются на всё время импорта.
+    Дубликаты пропускаются, некорректные записи(нет необходимых полей)
+    печатаются и пропускаются, импорт продолжается дальше.
     """
-    help = 'Импортирует в проект данные из json-объекта в модель Ingredient.'
+    help = ('Импортирует в проект данные из json-массива или csv '
+            'в модель Ingredient.')
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument('table_name', nargs=1, type=pathlib.Path)
+        parser.add_argument('--format',
+                            choices=[suffix.lstrip('.') for suffix in READERS],
+                            help='Формат файла (по умолчанию по расширению).')
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=IMPORT_BATCH_SIZE,
+                            help='Кол-во записей в одной пачке.')
+        parser.add_argument('--single-transaction',
+                            action='store_true',
+                            help='Выполнить весь импорт одной транзакцией.')
+        parser.add_argument('--dry-run',
+                            action='store_true',
+                            help='Только прочитать и проверить файл, '
+                                 'ничего не записывая в БД.')
 
     def handle(self, *args, **options):
         """Сами действия при запуске команды."""
         table_name = options['table_name'][0]
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть больше 0.')
+
+        suffix = (f'.{options["format"]}' if options['format']
+                  else table_name.suffix.lower())
+        reader = READERS.get(suffix)
+        if reader is None:
+            raise CommandError(f'Неизвестный формат файла: {table_name}.')
+
         self.stdout.write(self.style.NOTICE('Импорт начался, ожидайте...'))
         self.stdout.write(self.style.NOTICE('============================='))
+
+        self.units = {}
+        total_rows = 0
+        errors = 0
+        ingredients_before = Ingredient.objects.count()
+        started = time.monotonic()
+        atomic = (transaction.atomic() if options['single_transaction']
+                  else nullcontext())
+
         with open(table_name,
                   newline='',
-                  encoding='utf-8') as file:
-            reader = json.load(file)
-            total_rows = 0
-            success = 0
-
-            for row in reader:
-                total_rows += 1
-
-                try:
-                    unit, _ = MeasureUnit.objects.get_or_create(
-                        name=row['measurement_unit'])
-                    Ingredient.objects.get_or_create(
-                        name=row['name'], measurement_unit=unit)
-                    success += 1
-
-                except IntegrityError as err:
-                    print(f'Error: {err.args}')
-                    continue
-        errors = total_rows - success
+                  encoding='utf-8') as file, atomic:
+            for batch in batched(reader(file), batch_size):
+                rows = []
+                for row in batch:
+                    try:
+                        rows.append(clean_row(row))
+                    except ValueError as err:
+                        self.stdout.write(self.style.ERROR(f'Error: {err}'))
+                        errors += 1
+                total_rows += len(batch)
+
+                if rows and not dry_run:
+                    self.import_batch(rows)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Обработано записей: {total_rows} '
+                    f'({total_rows / elapsed if elapsed else 0:.0f} в сек.)')
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f'\nПроверка {table_name} завершена, БД не изменялась.'
+                f'\nВсего записей: {total_rows}'
+                f'\nКоличество ошибок: {errors}'))
+
+            return
+
+        # bulk_create не отправляет сигналы, поэтому версию справочника
+        # ингредиентов меняем вручную.
+        bump_version(INGREDIENTS_VERSION_KEY)
+        created = Ingredient.objects.count() - ingredients_before
         self.stdout.write(self.style.SUCCESS(
             f'\nДанные из таблицы {table_name} '
             f'успешно импортированы в модель {Ingredient.__name__}!'
-            f'\nКоличество ошибок: {errors}'))
+            f'\nВсего записей: {total_rows}'
+            f'\nДобавлено: {created}'
+            f'\nКоличество ошибок: {errors}'
+            f'\nЗатрачено: {time.monotonic() - started:.2f} сек.'))
+
+    def resolve_units(self, names):
+        """
+        Возвращает id единиц измерения по названиям,
+        создавая недостающие одним bulk_create.
+        Уже известные единицы берутся из памяти.
+        """
+        missing = set(names) - self.units.keys()
+        if missing:
+            MeasureUnit.objects.bulk_create(
+                (MeasureUnit(name=name) for name in missing),
+                ignore_conflicts=True)
+            self.units.update(MeasureUnit.objects.filter(name__in=missing)
+                              .values_list('name', 'id'))
+
+        return self.units
+
+    @transaction.atomic
+    def import_batch(self, rows):
+        """Записывает пачку проверенных записей в БД."""
+        units = self.resolve_units(unit for _, unit in rows)
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit_id=units[unit])
+             for name, unit in rows),
+            ignore_conflicts=True)
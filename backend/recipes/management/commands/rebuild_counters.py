@@ -0,0 +1,42 @@
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+from django.db import transaction
+
+from recipes.counters import COUNTERS, actual_count, wrong_counters
+
+
+class Command(BaseCommand):
+    """
+    Проверяет и пересчитывает денормализованные счётчики
+    (Recipe.favorites_count и in_carts_count,
+    CustomUser.followers_count, subscriptions_count и recipes_count).
+    Расхождения ищутся и исправляются одним UPDATE с подзапросом
+    на каждый счётчик, без загрузки объектов в память.
+    С --check только сообщает о расхождениях и завершается ошибкой,
+    если они есть.
+    """
+    help = 'Проверяет и пересчитывает счётчики рецептов и пользователей.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--check',
+                            action='store_true',
+                            help='Только проверить, ничего не исправляя.')
+
+    def handle(self, *args, **options):
+        wrong_total = 0
+        for counter in COUNTERS:
+            name = f'{counter.target.__name__}.{counter.field}'
+            with transaction.atomic():
+                wrong = wrong_counters(counter)
+                if options['check']:
+                    count = wrong.count()
+                else:
+                    count = wrong.update(
+                        **{counter.field: actual_count(counter)})
+            wrong_total += count
+            self.stdout.write(f'{name}: расхождений {count}')
+
+        if options['check'] and wrong_total:
+            raise CommandError(f'Неверных счётчиков: {wrong_total}.')
+
+        self.stdout.write(self.style.SUCCESS('Счётчики в порядке.'))
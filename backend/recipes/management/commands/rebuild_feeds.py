@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.feeds import materialize_feed
+from recipes.models import FeedEntry
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Перестраивает хранящиеся ленты подписок (FeedEntry):
+    строит заново ленты пользователей с подписками
+    больше FEED_MATERIALIZE_THRESHOLD и удаляет ленты остальных.
+    Нужна после изменения порога; в остальное время ленты
+    поддерживаются сигналами.
+    """
+    help = 'Перестраивает хранящиеся ленты подписок.'
+
+    def handle(self, *args, **options):
+        threshold = settings.FEED_MATERIALIZE_THRESHOLD
+        deleted, _ = (FeedEntry.objects
+                      .exclude(user__subscriptions_count__gt=threshold)
+                      .delete())
+        user_ids = list(CustomUser.objects
+                        .filter(subscriptions_count__gt=threshold)
+                        .values_list('pk', flat=True))
+        for user_id in user_ids:
+            materialize_feed(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Перестроено лент: {len(user_ids)}, '
+            f'удалено записей: {deleted}.'))
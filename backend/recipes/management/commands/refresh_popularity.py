@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    """
+    Обновляет рейтинг популярности рецептов (/api/recipes/popular/).
+    Рассчитана на запуск по расписанию (например, раз в несколько минут):
+    пересчитываются только рецепты, которые добавили в избранное
+    или корзину либо убрали оттуда после прошлого запуска.
+    С --full пересчитываются все рецепты.
+    """
+    help = 'Обновляет рейтинг популярности рецептов.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--full',
+                            action='store_true',
+                            help='Пересчитать рейтинг всех рецептов.')
+
+    def handle(self, *args, **options):
+        count = refresh_popularity(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитан рейтинг рецептов: {count}.'))
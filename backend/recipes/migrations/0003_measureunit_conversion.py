@@ -0,0 +1,26 @@
+# Generated by Django 4.2.1 on 2026-10-17 06:00
+
+from decimal import Decimal
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measureunit',
+            name='base_unit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='derived_units', to='recipes.measureunit', verbose_name='базовая единица'),
+        ),
+        migrations.AddField(
+            model_name='measureunit',
+            name='factor',
+            field=models.DecimalField(decimal_places=4, default=1, max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.0001'))], verbose_name='множитель к базовой единице'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+# Производная единица: (базовая единица, множитель).
+CONVERSIONS = {
+    'кг': ('г', Decimal('1000')),
+    'л': ('мл', Decimal('1000')),
+    'стакан': ('мл', Decimal('250')),
+    'ст. л.': ('мл', Decimal('15')),
+    'ч. л.': ('мл', Decimal('5')),
+    'капля': ('мл', Decimal('0.05')),
+}
+
+
+def add_conversions(apps, schema_editor):
+    MeasureUnit = apps.get_model('recipes', 'MeasureUnit')
+    for name, (base_name, factor) in CONVERSIONS.items():
+        base_unit, _ = MeasureUnit.objects.get_or_create(name=base_name)
+        MeasureUnit.objects.update_or_create(
+            name=name,
+            defaults={'base_unit': base_unit, 'factor': factor})
+
+
+def remove_conversions(apps, schema_editor):
+    MeasureUnit = apps.get_model('recipes', 'MeasureUnit')
+    MeasureUnit.objects.filter(name__in=CONVERSIONS).update(base_unit=None,
+                                                            factor=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_measureunit_conversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_conversions, remove_conversions),
+    ]
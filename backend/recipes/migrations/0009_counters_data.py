@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# (модель-цель, счётчик, модель-источник, внешний ключ источника).
+COUNTERS = (
+    (('recipes', 'Recipe'), 'favorites_count',
+     ('recipes', 'Favorite'), 'recipe'),
+    (('recipes', 'Recipe'), 'in_carts_count',
+     ('recipes', 'ShoppingCart'), 'recipe'),
+    (('users', 'CustomUser'), 'followers_count',
+     ('users', 'Subscription'), 'subscribing'),
+    (('users', 'CustomUser'), 'recipes_count',
+     ('recipes', 'Recipe'), 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for target, field, source, foreign_key in COUNTERS:
+        source = apps.get_model(*source)
+        apps.get_model(*target).objects.update(**{field: Coalesce(
+            Subquery(source.objects
+                     .filter(**{foreign_key: OuterRef('pk')})
+                     .order_by()
+                     .values(foreign_key)
+                     .annotate(count=Count('pk'))
+                     .values('count')),
+            0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.1 on 2026-10-17 06:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_counters_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RecipePopularity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipe', verbose_name='рецепт')),
+                ('score', models.FloatField(verbose_name='рейтинг')),
+                ('favorites_count', models.PositiveIntegerField(verbose_name='кол-во добавлений в избранное')),
+                ('in_carts_count', models.PositiveIntegerField(verbose_name='кол-во добавлений в корзины')),
+                ('refreshed_at', models.DateTimeField(verbose_name='время расчёта')),
+            ],
+            options={
+                'verbose_name': 'популярность рецепта',
+                'verbose_name_plural': 'популярность рецептов',
+                'indexes': [models.Index(fields=['-score', '-recipe'], name='recipe_popularity_score_idx')],
+            },
+        ),
+    ]
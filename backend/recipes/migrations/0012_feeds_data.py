@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_feeds(apps, schema_editor):
+    user_model = apps.get_model('users', 'CustomUser')
+    subscription_model = apps.get_model('users', 'Subscription')
+    recipe_model = apps.get_model('recipes', 'Recipe')
+    feed_entry_model = apps.get_model('recipes', 'FeedEntry')
+
+    user_model.objects.update(subscriptions_count=Coalesce(
+        Subquery(subscription_model.objects
+                 .filter(user=OuterRef('pk'))
+                 .order_by()
+                 .values('user')
+                 .annotate(count=Count('pk'))
+                 .values('count')),
+        0))
+    user_ids = list(user_model.objects.filter(
+        subscriptions_count__gt=settings.FEED_MATERIALIZE_THRESHOLD
+    ).values_list('pk', flat=True))
+    for user_id in user_ids:
+        feed_entry_model.objects.bulk_create(
+            feed_entry_model(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+            for pk, pub_date in recipe_model.objects.filter(
+                author__in=subscription_model.objects
+                .filter(user_id=user_id).values('subscribing')
+            ).values_list('pk', 'pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feed_entry'),
+        ('users', '0003_user_subscriptions_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-17 06:51
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feeds_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='recipes/images/', verbose_name='картинка'),
+        ),
+    ]
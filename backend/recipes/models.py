@@ -1,9 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
 
-from .constants import HEX_COLOR_REGEX, STANDART_MAX_LENGTH, TEXT_LENGTH
-from core.models import NameOrderingStr
+from .constants import (HEX_COLOR_REGEX, IMAGES_DIR, STANDART_MAX_LENGTH,
+                        TEXT_LENGTH, UNIT_FACTOR_DECIMAL_PLACES,
+                        UNIT_FACTOR_MAX_DIGITS, UNIT_FACTOR_MIN_VALUE)
+from core.models import CountersModel, NameOrderingStr
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -30,7 +34,27 @@ class Tag(NameOrderingStr):
 
 
 class MeasureUnit(NameOrderingStr):
-    """Модель единиц измерения. Имеет поле name."""
+    """
+    Модель единиц измерения.
+    Имеет поля:
+    name,
+    base_unit(базовая единица, в которую переводится эта, например кг -> г;
+    пусто, если единица сама базовая или не переводится),
+    factor(сколько базовых единиц в одной этой).
+    """
+    base_unit = models.ForeignKey('self',
+                                  null=True,
+                                  blank=True,
+                                  on_delete=models.SET_NULL,
+                                  related_name='derived_units',
+                                  verbose_name='базовая единица')
+    factor = models.DecimalField(max_digits=UNIT_FACTOR_MAX_DIGITS,
+                                 decimal_places=UNIT_FACTOR_DECIMAL_PLACES,
+                                 default=1,
+                                 validators=[MinValueValidator(
+                                     UNIT_FACTOR_MIN_VALUE)],
+                                 verbose_name='множитель к базовой единице')
+
     class Meta(NameOrderingStr.Meta):
         verbose_name = 'единица измерения'
         verbose_name_plural = 'единицы измерения'
@@ -55,19 +79,67 @@ class Ingredient(NameOrderingStr):
         verbose_name_plural = 'ингредиенты'
 
 
-class Recipe(NameOrderingStr):
+class RecipeQuerySet(models.QuerySet):
+    """
+    QuerySet рецептов: план подгрузки связанных объектов
+    и аннотации, зависящие от пользователя.
+    """
+    def with_related(self):
+        """
+        Подгружает всё, что выводит RecipeSerializer,
+        фиксированным числом запросов вне зависимости от кол-ва рецептов:
+        автора (join), тэги и ингредиенты рецепта
+        вместе с ингредиентом и его единицей измерения.
+        """
+        return (self.select_related('author')
+                .prefetch_related('tags')
+                .with_ingredients())
+
+    def with_ingredients(self):
+        """
+        Подгружает ингредиенты рецептов вместе с ингредиентом
+        и его единицей измерения одним запросом.
+        """
+        return self.prefetch_related(
+            Prefetch('recipeingredient_set',
+                     queryset=RecipeIngredient.objects.select_related(
+                         'ingredient__measurement_unit')))
+
+    def with_user_flags(self, user):
+        """
+        Добавляет булевы аннотации is_favorited и is_in_shopping_cart
+        подзапросами EXISTS, чтобы не делать запрос на каждый рецепт.
+        Для анонима аннотации не добавляются.
+        """
+        if not user.is_authenticated:
+
+            return self
+
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
+
+
+class Recipe(CountersModel, NameOrderingStr):
     """
     Модель рецептов.
     Имеет поля:
     name(название рецепта),
     ingredients(связь many-to-many к модели Ingredient),
     tags(связь many-to-many к модели Tag),
-    image(картинка к рецепту),
+    image(картинка к рецепту, хранится по хэшу содержимого без дублей),
     text(описание рецепта),
     cooking_time(время приготовления, должно быть >= 1),
     author(создатель рецепта, связь с моделью User),
     pub_date
-    (время публикации рецепта, автоматически ставится текущее время и дата).
+    (время публикации рецепта, автоматически ставится текущее время и дата),
+    updated_at
+    (время последнего изменения рецепта, в том числе тэгов и ингредиентов),
+    favorites_count и in_carts_count
+    (счётчики добавлений в избранное и в корзины, см. recipes.counters;
+    save() их не перезаписывает, см. CountersModel).
     """
     ingredients = models.ManyToManyField(Ingredient,
                                          through='RecipeIngredient',
@@ -77,7 +149,9 @@ class Recipe(NameOrderingStr):
                                   through='RecipeTag',
                                   related_name='recipes',
                                   verbose_name='тэг')
-    image = models.ImageField(upload_to='recipes/images/',
+    image = models.ImageField(upload_to=f'{IMAGES_DIR}/',
+                              storage=ContentAddressedStorage(),
+                              db_index=True,
                               verbose_name='картинка')
     text = models.TextField(verbose_name='описание')
     cooking_time = models.PositiveSmallIntegerField(
@@ -89,11 +163,31 @@ class Recipe(NameOrderingStr):
                                verbose_name='автор')
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name='дата публикации')
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='дата изменения')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='кол-во добавлений в избранное')
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='кол-во добавлений в корзины')
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='recipe_author_pub_date_idx'),
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -162,7 +256,8 @@ class Favorite(models.Model):
     Модель избранного.
     Имеет поля:
     user(связь с моделью User),
-    recipe(связь с моделью Recipe).
+    recipe(связь с моделью Recipe),
+    created_at(время добавления, нужно для рейтинга популярности).
     """
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
@@ -172,6 +267,9 @@ class Favorite(models.Model):
                                on_delete=models.CASCADE,
                                related_name='favorites',
                                verbose_name='рецепт')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      db_index=True,
+                                      verbose_name='дата добавления')
 
     class Meta:
         verbose_name = 'избранное'
@@ -192,7 +290,8 @@ class ShoppingCart(models.Model):
     Модель корзины покупок.
     Имеет поля:
     user(связь с моделью User),
-    recipe(связь с моделью Recipe).
+    recipe(связь с моделью Recipe),
+    created_at(время добавления, нужно для рейтинга популярности).
     """
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
@@ -202,6 +301,9 @@ class ShoppingCart(models.Model):
                                on_delete=models.CASCADE,
                                related_name='shopping_cart',
                                verbose_name='рецепт')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      db_index=True,
+                                      verbose_name='дата добавления')
 
     class Meta:
         verbose_name = 'корзина покупок'
@@ -214,3 +316,77 @@ class ShoppingCart(models.Model):
     def __str__(self):
         return (f'{self.user.username} '
                 f'добавил в корзину покупок рецепт "{self.recipe.name}"')
+
+
+class RecipePopularity(models.Model):
+    """
+    Материализованный рейтинг популярности рецептов
+    (заполняется командой refresh_popularity, см. recipes.popularity).
+    Имеет поля:
+    recipe(рецепт, он же первичный ключ),
+    score(сумма весов добавлений в избранное и корзины,
+    затухающих со временем),
+    favorites_count и in_carts_count
+    (значения счётчиков рецепта на момент расчёта),
+    refreshed_at(время расчёта).
+    Рецепты без добавлений в таблицу не попадают.
+    """
+    recipe = models.OneToOneField(Recipe,
+                                  primary_key=True,
+                                  on_delete=models.CASCADE,
+                                  related_name='popularity',
+                                  verbose_name='рецепт')
+    score = models.FloatField(verbose_name='рейтинг')
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='кол-во добавлений в избранное')
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='кол-во добавлений в корзины')
+    refreshed_at = models.DateTimeField(verbose_name='время расчёта')
+
+    class Meta:
+        verbose_name = 'популярность рецепта'
+        verbose_name_plural = 'популярность рецептов'
+        indexes = [
+            models.Index(fields=('-score', '-recipe'),
+                         name='recipe_popularity_score_idx')
+        ]
+
+    def __str__(self):
+
+        return f'{self.recipe_id}: {self.score:.3f}'
+
+
+class FeedEntry(models.Model):
+    """
+    Запись материализованной ленты подписок (см. recipes.feeds).
+    Имеет поля:
+    user(владелец ленты),
+    recipe(рецепт автора, на которого он подписан),
+    pub_date(копия даты публикации рецепта, чтобы лента
+    читалась по индексу без сортировки).
+    """
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries',
+                             verbose_name='пользователь')
+    recipe = models.ForeignKey(Recipe,
+                               on_delete=models.CASCADE,
+                               related_name='feed_entries',
+                               verbose_name='рецепт')
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe'),
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='feed_entry_user_pub_date_idx')
+        ]
+
+    def __str__(self):
+
+        return f'{self.user_id}: {self.recipe_id}'
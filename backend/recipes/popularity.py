@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .constants import (POPULARITY_CART_WEIGHT, POPULARITY_EPOCH,
+                        POPULARITY_FAVORITE_WEIGHT, POPULARITY_HALF_LIFE,
+                        POPULARITY_REFRESH_CHUNK_SIZE, RECIPES_VERSION_KEY)
+from .models import Favorite, Recipe, RecipePopularity, ShoppingCart
+from core.versions import bump_version
+
+# (модель добавлений, вес одного добавления).
+SOURCES = (
+    (Favorite, POPULARITY_FAVORITE_WEIGHT),
+    (ShoppingCart, POPULARITY_CART_WEIGHT),
+)
+
+
+def decayed_weight(weight, created_at):
+    """
+    Вклад добавления в рейтинг с "прямым" затуханием:
+    вес удваивается за каждый POPULARITY_HALF_LIFE от POPULARITY_EPOCH.
+    Это то же самое, что затухание старых добавлений вдвое
+    за каждый период, с точностью до общего для всех рецептов множителя,
+    поэтому однажды посчитанные рейтинги не нужно пересчитывать
+    с течением времени.
+    Раз в несколько лет POPULARITY_EPOCH стоит сдвигать вперёд
+    с полным пересчётом (refresh_popularity --full), иначе веса
+    выйдут за пределы float.
+    """
+    return weight * 2 ** ((created_at - POPULARITY_EPOCH)
+                          / POPULARITY_HALF_LIFE)
+
+
+def stale_recipes(since):
+    """
+    Рецепты, рейтинг которых нужно пересчитать:
+    с добавлениями в избранное или корзины после since
+    и со счётчиками (см. recipes.counters), отличающимися от тех,
+    с которыми считался рейтинг (так находятся удаления).
+    Если since - None, возвращает все рецепты с добавлениями
+    или с рейтингом.
+    """
+    if since is None:
+
+        return Recipe.objects.filter(Q(favorites_count__gt=0)
+                                     | Q(in_carts_count__gt=0)
+                                     | Q(popularity__isnull=False))
+
+    changed = Q(pk__in=RecipePopularity.objects.exclude(
+        favorites_count=F('recipe__favorites_count'),
+        in_carts_count=F('recipe__in_carts_count')).values('recipe_id'))
+    for source, weight in SOURCES:
+        changed |= Q(pk__in=source.objects
+                     .filter(created_at__gt=since)
+                     .values('recipe_id'))
+
+    return Recipe.objects.filter(changed)
+
+
+def refresh_chunk(recipe_ids, refreshed_at):
+    """
+    Пересчитывает рейтинг рецептов recipe_ids по всем их добавлениям.
+    Счётчики читаются до добавлений: если между чтениями появится
+    новое добавление, рецепт пересчитается ещё раз при следующем запуске.
+    """
+    counts = {pk: (favorites_count, in_carts_count)
+              for pk, favorites_count, in_carts_count
+              in Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                  'pk', 'favorites_count', 'in_carts_count')}
+    scores = dict.fromkeys(counts, 0.0)
+    for source, weight in SOURCES:
+        for recipe_id, created_at in (source.objects
+                                      .filter(recipe_id__in=counts)
+                                      .values_list('recipe_id', 'created_at')
+                                      .iterator()):
+            scores[recipe_id] += decayed_weight(weight, created_at)
+
+    with transaction.atomic():
+        RecipePopularity.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipePopularity.objects.bulk_create(
+            RecipePopularity(recipe_id=pk,
+                             score=score,
+                             favorites_count=counts[pk][0],
+                             in_carts_count=counts[pk][1],
+                             refreshed_at=refreshed_at)
+            for pk, score in scores.items() if score)
+
+
+def refresh_popularity(full=False):
+    """
+    Обновляет таблицу RecipePopularity и возвращает число
+    пересчитанных рецептов.
+    По умолчанию пересчитываются только рецепты, изменившиеся
+    после прошлого запуска (см. stale_recipes), с full - все.
+    Рецепты пересчитываются пачками по POPULARITY_REFRESH_CHUNK_SIZE.
+    """
+    refreshed_at = timezone.now()
+    since = None
+    if not full:
+        since = RecipePopularity.objects.aggregate(
+            since=Max('refreshed_at'))['since']
+    recipe_ids = list(stale_recipes(since).order_by()
+                      .values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), POPULARITY_REFRESH_CHUNK_SIZE):
+        refresh_chunk(
+            recipe_ids[start:start + POPULARITY_REFRESH_CHUNK_SIZE],
+            refreshed_at)
+    if recipe_ids:
+        bump_version(RECIPES_VERSION_KEY)
+
+    return len(recipe_ids)
@@ -0,0 +1,280 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from threading import Lock
+
+from .constants import (COVERAGE_INDEX_CHUNK_SIZE, FUZZY_SEARCH_LIMIT,
+                        FUZZY_SEARCH_THRESHOLD, INGREDIENTS_VERSION_KEY,
+                        RECIPE_INGREDIENTS_VERSION_KEY)
+from .models import Ingredient, RecipeIngredient
+from core.versions import get_version
+
+WORD_REGEX = re.compile(r'\w+')
+MAX_CHAR = chr(0x10FFFF)
+
+IngredientTables = namedtuple('IngredientTables', (
+    'rows', 'keys', 'entries', 'word_keys', 'word_entries',
+    'trigram_counts', 'postings'))
+
+
+def normalize(text):
+    """Приводит строку к виду для поиска: нижний регистр, ё -> е."""
+    return text.strip().lower().replace('ё', 'е')
+
+
+def trigrams(text):
+    """
+    Возвращает множество триграмм строки по правилам pg_trgm:
+    каждое слово дополняется двумя пробелами в начале и одним в конце.
+    """
+    result = set()
+    for word in WORD_REGEX.findall(text):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return result
+
+
+def prefix_range(keys, entries, prefix, limit=None):
+    """
+    Возвращает позиции записей, ключ которых начинается с prefix
+    (не более limit, если он задан).
+    keys и entries отсортированы по ключу, границы ищутся bisect'ом.
+    """
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + MAX_CHAR, lo=start)
+    if limit is not None:
+        end = min(end, start + limit)
+
+    return [position for _, position in entries[start:end]]
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса.
+    Хранит готовое представление каждого ингредиента и три структуры:
+    - отсортированные названия - для поиска по началу названия (bisect),
+    - отсортированные слова названий - для поиска по началу любого слова,
+    - инвертированный индекс триграмм (компактные массивы позиций) -
+      для нечёткого поиска с опечатками.
+    Поиск не обращается к БД.
+    Строится лениво при первом запросе и перестраивается,
+    когда меняется версия справочника ингредиентов.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        # Все структуры заменяются одним присваиванием, чтобы поиск
+        # не увидел половину старого индекса и половину нового;
+        # каждый поиск работает с одним снимком self.tables.
+        self.tables = IngredientTables([], [], [], [], [], array('H'), {})
+
+    def build(self, version):
+        """Загружает ингредиенты одним запросом и строит индекс."""
+        rows = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit__name')
+        ]
+        # Позиция в rows сохраняет порядок модели (по name),
+        # все структуры ниже ссылаются на неё.
+        names = [normalize(row['name']) for row in rows]
+        entries = sorted((name, position)
+                         for position, name in enumerate(names))
+        word_entries = sorted({(word, position)
+                               for position, name in enumerate(names)
+                               for word in WORD_REGEX.findall(name)})
+        postings = defaultdict(lambda: array('I'))
+        trigram_counts = array('H')
+        for position, name in enumerate(names):
+            name_trigrams = trigrams(name)
+            trigram_counts.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                postings[trigram].append(position)
+
+        self.tables = IngredientTables(
+            rows=rows,
+            keys=[key for key, _ in entries],
+            entries=entries,
+            word_keys=[key for key, _ in word_entries],
+            word_entries=word_entries,
+            trigram_counts=trigram_counts,
+            postings=dict(postings))
+        self.version = version
+
+    def refresh(self):
+        """
+        Перестраивает индекс, если версия справочника изменилась,
+        и возвращает текущие структуры индекса.
+        """
+        version = get_version(INGREDIENTS_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+        return self.tables
+
+    def search(self, prefix=''):
+        """
+        Возвращает ингредиенты, название которых начинается с prefix
+        (без учёта регистра), в порядке модели.
+        """
+        tables = self.refresh()
+        prefix = normalize(prefix)
+        if not prefix:
+
+            return tables.rows
+
+        positions = prefix_range(tables.keys, tables.entries, prefix)
+
+        return [tables.rows[position] for position in sorted(positions)]
+
+    def similar(self, tables, query, exclude, limit):
+        """
+        Возвращает позиции, похожие на query по триграммам
+        (сходство как в pg_trgm, не ниже FUZZY_SEARCH_THRESHOLD),
+        от более похожих к менее похожим.
+        Общие триграммы считаются слиянием списков позиций запроса,
+        поэтому время поиска пропорционально длине этих списков,
+        а не размеру справочника.
+        """
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+
+            return []
+
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(tables.postings.get(trigram, ()))
+
+        # При сходстве не ниже порога у названия должно быть
+        # не меньше threshold * len(query_trigrams) общих триграмм.
+        required = FUZZY_SEARCH_THRESHOLD * len(query_trigrams)
+        scored = []
+        for position, count in shared.items():
+            if count < required or position in exclude:
+                continue
+            score = count / (len(query_trigrams)
+                             + tables.trigram_counts[position] - count)
+            if score >= FUZZY_SEARCH_THRESHOLD:
+                scored.append((-score, position))
+
+        return [position for _, position in heapq.nsmallest(limit, scored)]
+
+    def search_fuzzy(self, query, limit=FUZZY_SEARCH_LIMIT):
+        """
+        Поиск с ранжированием, не более limit результатов:
+        1) название начинается с query,
+        2) с query начинается любое слово названия,
+        3) название похоже на query по триграммам (опечатки).
+        Внутри первых двух групп - порядок модели.
+        """
+        tables = self.refresh()
+        query = normalize(query)
+        if not query:
+
+            return tables.rows[:limit]
+
+        ranked = sorted(prefix_range(tables.keys, tables.entries, query,
+                                     limit))
+        found = set(ranked)
+        words = sorted(set(prefix_range(tables.word_keys,
+                                        tables.word_entries,
+                                        query,
+                                        limit)) - found)
+        ranked.extend(words)
+        found.update(words)
+        if len(ranked) < limit:
+            ranked.extend(self.similar(tables, query, found,
+                                       limit - len(ranked)))
+
+        return [tables.rows[position] for position in ranked[:limit]]
+
+
+class RecipeCoverageIndex:
+    """
+    Инвертированный индекс состава рецептов в памяти процесса.
+    Для каждого ингредиента хранит компактный массив позиций рецептов,
+    в которых он есть, а для каждой позиции - id рецепта
+    и число его ингредиентов.
+    Покрытие рецепта набором ингредиентов (доля ингредиентов рецепта,
+    которые есть в наборе) считается слиянием массивов ингредиентов
+    набора без обращения к БД, поэтому время поиска пропорционально
+    длине этих массивов, а не числу рецептов.
+    Строится лениво при первом запросе и перестраивается,
+    когда меняется состав рецептов; пока один поток перестраивает
+    индекс, остальные отвечают по прежнему.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        # (id рецептов, число ингредиентов, позиции по ингредиентам) -
+        # заменяются одним присваиванием, чтобы поиск не увидел
+        # половину старого индекса и половину нового.
+        self.tables = (array('I'), array('H'), {})
+
+    def build(self, version):
+        """Загружает состав рецептов одним запросом и строит индекс."""
+        recipe_ids = array('I')
+        sizes = array('H')
+        postings = defaultdict(lambda: array('I'))
+        for recipe_id, ingredient_id in (
+                RecipeIngredient.objects
+                .order_by('recipe_id')
+                .values_list('recipe_id', 'ingredient_id')
+                .iterator(chunk_size=COVERAGE_INDEX_CHUNK_SIZE)):
+            if not recipe_ids or recipe_ids[-1] != recipe_id:
+                recipe_ids.append(recipe_id)
+                sizes.append(0)
+            sizes[-1] += 1
+            postings[ingredient_id].append(len(recipe_ids) - 1)
+
+        self.tables = (recipe_ids, sizes, dict(postings))
+        self.version = version
+
+    def refresh(self):
+        """
+        Перестраивает индекс, если состав рецептов изменился.
+        Ждёт построения только первый запрос, когда индекса ещё нет.
+        """
+        version = get_version(RECIPE_INGREDIENTS_VERSION_KEY)
+        if version == self.version:
+
+            return
+
+        if self.lock.acquire(blocking=self.version is None):
+            try:
+                if version != self.version:
+                    self.build(version)
+            finally:
+                self.lock.release()
+
+    def rank(self, ingredient_ids, limit):
+        """
+        Ранжирует рецепты по покрытию набором ingredient_ids.
+        Возвращает число рецептов хотя бы с одним ингредиентом набора
+        и до limit лучших из них тройками
+        (id рецепта, найдено ингредиентов, всего ингредиентов):
+        по убыванию покрытия, затем числа найденных ингредиентов,
+        затем от новых рецептов к старым.
+        """
+        self.refresh()
+        recipe_ids, sizes, postings = self.tables
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(postings.get(ingredient_id, ()))
+
+        best = heapq.nlargest(
+            limit,
+            matched.items(),
+            key=lambda item: (item[1] / sizes[item[0]], item[1], item[0]))
+
+        return len(matched), [(recipe_ids[position], count, sizes[position])
+                              for position, count in best]
+
+
+ingredient_index = IngredientIndex()
+recipe_coverage_index = RecipeCoverageIndex()
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .constants import (INGREDIENTS_VERSION_KEY,
+                        RECIPE_INGREDIENTS_VERSION_KEY, RECIPES_VERSION_KEY,
+                        TAGS_VERSION_KEY)
+from .counters import change_counters
+from .feeds import follow, publish, unfollow
+from .images import image_variants
+from .models import (Favorite, Ingredient, MeasureUnit, Recipe, ShoppingCart,
+                     Tag)
+from .versions import bump_shopping_cart_version
+from core.versions import bump_version
+from users.models import Subscription
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=MeasureUnit)
+def bump_ingredients_version(**kwargs):
+    """Меняет версию справочника ингредиентов при любом его изменении."""
+    bump_version(INGREDIENTS_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(**kwargs):
+    """Меняет версию справочника тэгов при любом его изменении."""
+    bump_version(TAGS_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def bump_shopping_cart(instance, **kwargs):
+    """Меняет версию корзины пользователя при добавлении/удалении рецепта."""
+    bump_shopping_cart_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def bump_new_recipe_ingredients_version(created, **kwargs):
+    """
+    Меняет версию состава рецептов при создании рецепта:
+    ингредиенты создаются bulk_create без сигналов, но в той же
+    транзакции, а версия меняется после её коммита.
+    Изменения состава существующих рецептов -
+    см. recipes.versions.bump_recipe_ingredients.
+    """
+    if created:
+        bump_version(RECIPE_INGREDIENTS_VERSION_KEY)
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_deleted_recipe_ingredients_version(**kwargs):
+    """
+    Меняет версию состава рецептов при удалении рецепта.
+    У RecipeIngredient нет своих сигналов, поэтому его строки
+    удаляются каскадом одним запросом.
+    """
+    bump_version(RECIPE_INGREDIENTS_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def bump_recipes_version(**kwargs):
+    """
+    Меняет версию списков рецептов (от неё зависят закэшированные count)
+    при изменении рецептов, избранного и корзин.
+    Смена тэгов рецепта сохраняет и сам рецепт (updated_at).
+    """
+    bump_version(RECIPES_VERSION_KEY)
+
+
+@receiver(post_save, sender=Recipe)
+def generate_image_variants(instance, **kwargs):
+    """Ставит создание вариантов картинки в очередь после коммита."""
+    if instance.image:
+        image_name = instance.image.name
+        transaction.on_commit(lambda: image_variants.enqueue(image_name))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчики при создании избранного, корзины и т.д."""
+    if created and not raw:
+        change_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    """Уменьшает счётчики при удалении избранного, корзины и т.д."""
+    change_counters(sender, instance, -1)
+
+
+@receiver(post_save, sender=Subscription)
+def add_author_to_feed(instance, created, raw=False, **kwargs):
+    """
+    Добавляет рецепты автора в хранящуюся ленту подписчика
+    (после increment_counters, чтобы счётчик подписок был новым).
+    """
+    if created and not raw:
+        follow(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_author_from_feed(instance, **kwargs):
+    """Убирает рецепты автора из хранящейся ленты подписчика."""
+    unfollow(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def publish_to_feeds(instance, created, raw=False, **kwargs):
+    """Добавляет новый рецепт в хранящиеся ленты подписчиков автора."""
+    if created and not raw:
+        publish(instance)
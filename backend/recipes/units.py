@@ -0,0 +1,70 @@
+from collections import defaultdict
+from decimal import Decimal
+from threading import Lock
+
+from .constants import (INGREDIENTS_VERSION_KEY, UNIT_AMOUNT_DECIMAL_PLACES,
+                        UNIT_DISPLAY_RULES)
+from .models import MeasureUnit
+from core.versions import get_version
+
+AMOUNT_QUANTUM = Decimal(1).scaleb(-UNIT_AMOUNT_DECIMAL_PLACES)
+
+
+class UnitConverter:
+    """
+    Таблица перевода единиц измерения в памяти процесса.
+    Для каждой базовой единицы хранит множители единиц,
+    которые в неё переводятся.
+    Загружается одним запросом и перезагружается,
+    когда меняется версия справочника ингредиентов
+    (изменения MeasureUnit тоже меняют эту версию).
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.factors = {}
+
+    def build(self, version):
+        factors = defaultdict(dict)
+        for name, base_name, factor in MeasureUnit.objects.filter(
+                base_unit__isnull=False).values_list(
+                'name', 'base_unit__name', 'factor'):
+            factors[base_name][name] = factor
+        self.factors = dict(factors)
+        self.version = version
+
+    def refresh(self):
+        """Перезагружает таблицу, если версия справочника изменилась."""
+        version = get_version(INGREDIENTS_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def humanize(self, amount, base_unit):
+        """
+        Переводит количество в базовых единицах в единицу для показа
+        по правилам UNIT_DISPLAY_RULES: первую подходящую по диапазону
+        количества, в которой значение кратно шагу
+        (1500 г -> 1.5 кг, 30 мл -> 2 ст. л., 100 мл -> 100 мл).
+        Если такой нет, оставляет базовую единицу с округлением.
+        Возвращает пару (количество строкой, единица).
+        """
+        self.refresh()
+        amount = Decimal(amount)
+        factors = self.factors.get(base_unit, {})
+        for name, lower, upper, step in UNIT_DISPLAY_RULES.get(base_unit,
+                                                               ()):
+            if (name not in factors or amount < lower
+                    or upper is not None and amount >= upper):
+                continue
+
+            value = amount / factors[name]
+            if value % step == 0:
+
+                return f'{value.normalize():f}', name
+
+        return f'{amount.quantize(AMOUNT_QUANTUM).normalize():f}', base_unit
+
+
+unit_converter = UnitConverter()
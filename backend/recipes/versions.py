@@ -0,0 +1,44 @@
+from django.db import transaction
+
+from .constants import (RECIPE_INGREDIENTS_VERSION_KEY,
+                        SHOPPING_CART_VERSION_KEY)
+from .models import ShoppingCart
+from core.versions import (bump_version, get_version, get_versions_cache,
+                           new_version)
+
+
+def get_shopping_cart_version(user_id):
+    """Версия содержимого корзины покупок пользователя."""
+    return get_version(SHOPPING_CART_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_shopping_cart_version(user_id):
+    """Меняет версию корзины покупок пользователя."""
+    bump_version(SHOPPING_CART_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_shopping_carts_with_recipe(recipe_id):
+    """
+    Меняет версии корзин всех пользователей, у которых в корзине
+    лежит рецепт recipe_id (например, после изменения его ингредиентов).
+    Корзины выбираются одним запросом после коммита транзакции.
+    """
+    def bump():
+        get_versions_cache().set_many(
+            {SHOPPING_CART_VERSION_KEY.format(user_id=user_id): new_version()
+             for user_id in (ShoppingCart.objects.filter(recipe_id=recipe_id)
+                             .values_list('user_id', flat=True))},
+            timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def bump_recipe_ingredients(recipe_id):
+    """
+    Меняет версию состава рецептов и версии корзин с рецептом recipe_id.
+    Строки RecipeIngredient не отправляют сигналов (иначе их удаление
+    вместе с рецептом шло бы построчно), поэтому это вызывают
+    там, где меняют состав рецепта.
+    """
+    bump_version(RECIPE_INGREDIENTS_VERSION_KEY)
+    bump_shopping_carts_with_recipe(recipe_id)
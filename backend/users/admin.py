@@ -6,7 +6,8 @@ from .models import CustomUser, Subscription
 
 @admin.register(CustomUser)
 class UserAdmin(BaseUserAdmin):
-    list_display = ('id', 'username', 'email', 'first_name', 'last_name')
+    list_display = ('id', 'username', 'email', 'first_name', 'last_name',
+                    'followers_count', 'subscriptions_count', 'recipes_count')
     list_filter = ('email', 'first_name')
 
 
@@ -1,3 +1,6 @@
 EMAIL_MAX_LENGTH = 254
 NAME_PASS_MAX_LENGTH = 150
 USERNAME_REGEX = r'^[\w.@+-]+$'
+USERS_VERSION_KEY = 'version:users'
+SUBSCRIPTIONS_VERSION_KEY = 'version:subscriptions'
+AUTH_VERSION_KEY = 'version:auth:{user_id}'
@@ -3,9 +3,10 @@ from django.core.validators import RegexValidator
 from django.db import models
 
 from .constants import EMAIL_MAX_LENGTH, NAME_PASS_MAX_LENGTH, USERNAME_REGEX
+from core.models import CountersModel
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CountersModel, AbstractUser):
     """
     Кастомная модель пользователей.
     Поля first_name и last_name - обязательны.
@@ -14,6 +15,10 @@ class CustomUser(AbstractUser):
     Поля email и username должны быть уникальными.
     Поле username дополнительно проверяется
     на отсутствие недопустимых символов.
+    followers_count, subscriptions_count и recipes_count - счётчики
+    подписчиков, подписок и рецептов,
+    поддерживаются сигналами (см. recipes.counters)
+    и не перезаписываются при save() (см. CountersModel).
     """
     email = models.EmailField(max_length=EMAIL_MAX_LENGTH,
                               unique=True,
@@ -29,6 +34,21 @@ class CustomUser(AbstractUser):
                                  verbose_name='фамилия')
     password = models.CharField(max_length=NAME_PASS_MAX_LENGTH,
                                 verbose_name='пароль')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='кол-во подписчиков')
+    subscriptions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='кол-во подписок')
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='кол-во рецептов')
+    counter_fields = ('followers_count',
+                      'subscriptions_count',
+                      'recipes_count')
     REQUIRED_FIELDS = ['username',
                        'first_name',
                        'last_name']
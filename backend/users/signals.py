@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .constants import (AUTH_VERSION_KEY, SUBSCRIPTIONS_VERSION_KEY,
+                        USERS_VERSION_KEY)
+from .models import CustomUser, Subscription
+from core.versions import bump_version
+
+
+@receiver((post_save, post_delete), sender=CustomUser)
+def bump_users_version(instance, update_fields=None, **kwargs):
+    """
+    Меняет версию данных пользователей при их изменении.
+    Вместе с ней меняется версия аутентификации этого пользователя,
+    чтобы смена пароля, деактивация или правка профиля сразу
+    сбрасывали его закэшированные токены (токены остальных
+    пользователей не сбрасываются).
+    Обновление одного last_login при входе не учитывается.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+
+        return
+
+    bump_version(USERS_VERSION_KEY)
+    bump_version(AUTH_VERSION_KEY.format(user_id=instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def bump_auth_version(instance, **kwargs):
+    """
+    Меняет версию аутентификации пользователя при удалении
+    его токена (выход).
+    """
+    bump_version(AUTH_VERSION_KEY.format(user_id=instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def bump_subscriptions_version(**kwargs):
+    """Меняет версию подписок при подписке/отписке."""
+    bump_version(SUBSCRIPTIONS_VERSION_KEY)